@@ -1,12 +1,15 @@
 import sqlite3
 import os
-import threading
 import time
-from random import randint
-from typing import List, Dict, Any, Optional
+import logging
+import logging.handlers
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Union
 
 # Assuming your DbConnectionProvider is in modules.db
 from modules.impl.connection.SqliteConnectionProvider import SqliteConnectionProvider 
+from modules.impl.connection.ShardedSqliteConnectionProvider import ShardedSqliteConnectionProvider
 
 # Import your specific DAO implementations
 from modules.impl.dao.SqliteDaoChat import SqliteDaoChat
@@ -14,6 +17,41 @@ from modules.impl.dao.SqliteDaoUser import SqliteDaoUser
 
 # Define the database path for this test
 DB_PATH = "database/test_dao.db"
+# Chat shard files used by the concurrent test (menu option 7) when more than one shard is requested
+CHAT_SHARD_PATH = "database/test_dao_chat_{}.db"
+# Attempts for a concurrent-insert transaction before giving up
+COMMIT_RETRIES = 5
+# Errors after which a concurrent-insert transaction is retried (error names need Python 3.11+,
+# older versions are matched on the "database is locked" message)
+BUSY_ERROR_NAMES = ("SQLITE_BUSY", "SQLITE_LOCKED", "SQLITE_BUSY_SNAPSHOT")
+
+logger = logging.getLogger("dao")
+
+def start_logging(verbose: bool = False) -> logging.handlers.QueueListener:
+    """
+    Routes the 'dao' logger through a queue: workers only enqueue records and a single
+    background thread formats and writes them, so threads never contend on stdout.
+    The queue is a multiprocessing.Queue, so worker processes set up with init_worker_logging()
+    log to the same listener. The returned listener must be stopped to flush pending records.
+    """
+    log_queue = multiprocessing.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    logger.propagate = False
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    return listener
+
+def init_worker_logging(log_queue: Optional[multiprocessing.Queue], level: int):
+    """
+    Initializer of the worker processes: sends their 'dao' records to the parent's log queue.
+    Without it, a spawned worker has no handler and its records are lost.
+    """
+    if log_queue is None:
+        return
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)] # Replaces a handler inherited by fork
+    logger.setLevel(level)
+    logger.propagate = False
 
 def setup_db_and_daos(db_path: str, verbose: bool = False):
     """
@@ -26,15 +64,19 @@ def setup_db_and_daos(db_path: str, verbose: bool = False):
         os.makedirs(db_dir)
 
     # Initialize the connection provider
-    conn_provider = SqliteConnectionProvider(database_path=db_path)
+    conn_provider = SqliteConnectionProvider(database_path=db_path, verbose=verbose)
     
     # Get a connection to initialize tables
-    with conn_provider.get_connection() as conn:
+    with conn_provider.pooled_connection() as conn:
+        # WAL and the per-connection PRAGMAs are applied by the provider.
         user_dao = SqliteDaoUser(connection=conn, verbose=verbose)
         chat_dao = SqliteDaoChat(connection=conn, verbose=verbose)
         
         user_dao.create_table_users()
         chat_dao.create_table_chat_history()
+
+        # Refresh the query planner statistics now that the tables and indexes exist
+        conn.execute("PRAGMA optimize;")
         
     if verbose:
         print(f"Database tables initialized in {db_path}")
@@ -42,243 +84,331 @@ def setup_db_and_daos(db_path: str, verbose: bool = False):
     return conn_provider # Return the provider so connections can be obtained later
 
 
-def insert_messages_dao(conn_provider: SqliteConnectionProvider, user_id: int, session_id: str, num_messages: int, verbose: bool = False):
+def setup_chat_shards(num_shards: int, verbose: bool = False) -> ShardedSqliteConnectionProvider:
     """
-    Function to be run by threads to insert multiple chat messages using the Chat DAO.
-    Each thread gets its own connection for the operation.
+    Creates fresh chat shard databases and ensures the chat history table exists in each of them.
     """
-    for i in range(num_messages):
-        with conn_provider.get_connection() as conn: # Get a new connection for each DAO operation
-            chat_dao = SqliteDaoChat(connection=conn, verbose=verbose)
-            role = "user"
-            text = f"Concurrent message {i} from user {user_id} in session {session_id}"
-            
-            inserted = chat_dao.insert_chat_history(user_id, session_id, role, text)
-            if verbose:
-                print(f"{'Inserted' if inserted else 'Failed to insert'}: {text}")
+    shard_paths = [CHAT_SHARD_PATH.format(i) for i in range(num_shards)]
+    for path in shard_paths:
+        SqliteConnectionProvider.remove_database_files(path)
+
+    sharded_provider = ShardedSqliteConnectionProvider(shard_paths)
+    for shard in sharded_provider.shards:
+        with shard.pooled_connection() as conn:
+            SqliteDaoChat(connection=conn, verbose=verbose).create_table_chat_history()
+
+    if verbose:
+        print(f"Chat history sharded across {num_shards} database files.")
+    return sharded_provider
+
+
+def insert_messages_dao(conn_provider: Union[SqliteConnectionProvider, ShardedSqliteConnectionProvider], user_id: int, session_id: str, num_messages: int, verbose: bool = False, simulate_jitter: bool = False):
+    """
+    Inserts multiple chat messages using the Chat DAO (run by each worker of menu option 7).
+    Each worker checks out one pooled connection and inserts all its messages with a single
+    executemany() in one transaction, so the row loop runs in C and the commit is paid once.
+    With a sharded provider, the messages go to the shard that owns 'user_id'.
+    If SQLite supports BEGIN CONCURRENT, the transaction uses it so non-conflicting writers
+    commit in parallel. A transaction that fails because the database is busy (lock still held
+    after busy_timeout, or a conflicting concurrent commit) is retried with exponential backoff;
+    after COMMIT_RETRIES attempts the worker gives up and returns False.
+    Set 'simulate_jitter' to add a short random pause, e.g. to exercise lock contention;
+    it is off by default so timings reflect the DAO alone.
+    """
+    if isinstance(conn_provider, ShardedSqliteConnectionProvider):
+        conn_provider = conn_provider.shard_for(user_id)
+
+    # Format the constant part of the text once; each row only appends its index
+    role = "user"
+    prefix = f"Concurrent message from user {user_id} in session {session_id}: "
+    rows = [(user_id, session_id, role, prefix + str(i)) for i in range(num_messages)]
+    begin_mode = "CONCURRENT" if conn_provider.supports_begin_concurrent() else "IMMEDIATE"
+
+    with conn_provider.pooled_connection() as conn: # One pooled connection for the whole run
+        chat_dao = SqliteDaoChat(connection=conn, verbose=verbose)
+        inserted = False
+        for attempt in range(COMMIT_RETRIES):
+            try:
+                with chat_dao.transaction(begin_mode):
+                    inserted = chat_dao.insert_chat_history_many(rows)
+                break
+            except sqlite3.OperationalError as e:
+                # SQLITE_BUSY/SQLITE_LOCKED: the write lock was still held after busy_timeout.
+                # SQLITE_BUSY_SNAPSHOT: a BEGIN CONCURRENT commit conflicted with another writer.
+                # The transaction was rolled back as a whole, so the batch can simply be retried.
+                if getattr(e, "sqlite_errorname", None) not in BUSY_ERROR_NAMES and "locked" not in str(e):
+                    raise
+                if attempt == COMMIT_RETRIES - 1:
+                    logger.warning("Giving up on %d messages for user %s after %d attempts: %s",
+                                   len(rows), user_id, COMMIT_RETRIES, e)
+                    break
+                time.sleep(0.001 * 2 ** attempt)
+    # Logged once per batch, after the commit; formatting is deferred to the logging thread
+    logger.debug("%s %d messages for user %s in session %s",
+                 "Inserted" if inserted else "Failed to insert", len(rows), user_id, session_id)
+
+    if simulate_jitter:
+        from random import randint
+        time.sleep(randint(0, 2) * 0.005) # Simulate some variable work, outside the transaction
+    return inserted
+
+def insert_messages_process(database_paths: List[str], user_id: int, session_id: str, num_messages: int, simulate_jitter: bool = False) -> bool:
+    """
+    Entry point of a worker process for menu option 7.
+    SQLite connections cannot be pickled, so each process opens its own provider
+    (sharded when several database paths are given) and holds a single connection.
+    """
+    if len(database_paths) > 1:
+        conn_provider = ShardedSqliteConnectionProvider(database_paths, pool_size=1)
+    else:
+        conn_provider = SqliteConnectionProvider(database_path=database_paths[0], pool_size=1)
+    return insert_messages_dao(conn_provider, user_id, session_id, num_messages, simulate_jitter=simulate_jitter)
+
+# --- Menu handlers: one small function per menu option, each taking the connection provider ---
+# Handlers use the DAOs cached on the pooled connection (conn.user_dao, conn.chat_dao).
+
+def _h_create_user(connection_provider: SqliteConnectionProvider):
+    username = input("Username: ").strip()
+    password_hash = input("Password hash: ").strip()
+    email = input("Email: ").strip()
+    
+    with connection_provider.pooled_connection() as conn:
+        user_dao = conn.user_dao
+        user_id = user_dao.insert_user(username, password_hash, email) # Returns the new ID
+        if user_id:
+            print(f"User '{username}' created. ID: {user_id}")
+        else:
+            print(f"Failed to create user '{username}'. (Might already exist)")
+
+def _h_get_user_id(connection_provider: SqliteConnectionProvider):
+    username = input("Username to look up: ").strip()
+    with connection_provider.pooled_connection(read_only=True) as conn:
+        user_dao = conn.user_dao
+        user_data = user_dao.get_user_id_by_username(username)
+        if user_data:
+            print(f"User found: ID={user_data['id']}")
+        else:
+            print(f"User '{username}' not found.")
+
+def _h_add_chat_message(connection_provider: SqliteConnectionProvider):
+    try:
+        user_id = int(input("User ID: ").strip())
+    except ValueError:
+        print("Invalid User ID. Please enter an integer.")
+        return
+    session_id = input("Session ID: ").strip()
+    role = input("Role (e.g., 'user', 'bot'): ").strip()
+    text = input("Message text: ").strip()
+    
+    with connection_provider.pooled_connection() as conn:
+        chat_dao = conn.chat_dao
+        inserted = chat_dao.insert_chat_history(user_id, session_id, role, text)
+        if inserted:
+            print(f"Message added for user {user_id}, session '{session_id}'.")
+        else:
+            print("Failed to add message.")
+
+def _h_get_chat_history(connection_provider: SqliteConnectionProvider):
+    try:
+        user_id = int(input("User ID: ").strip())
+    except ValueError:
+        print("Invalid User ID. Please enter an integer.")
+        return
+    session_id = input("Session ID: ").strip()
+    
+    with connection_provider.pooled_connection(read_only=True) as conn:
+        chat_dao = conn.chat_dao
+        messages = chat_dao.get_chat_history_for_user_and_session(user_id, session_id)
+        if messages:
+            print(f"Chat history for user {user_id} session '{session_id}':")
+            for role, text in messages: # Positional unpacking, no column-name lookups per row
+                print(f"  [Role:{role}] {text}")
+        else:
+            print("No messages found.")
+
+def _h_delete_user(connection_provider: SqliteConnectionProvider):
+    try:
+        user_id = int(input("User ID to delete: ").strip())
+    except ValueError:
+        print("Invalid User ID. Please enter an integer.")
+        return
+    
+    with connection_provider.pooled_connection() as conn:
+        user_dao = conn.user_dao
+        deleted = user_dao.delete_user(user_id)
+        if deleted:
+            print(f"User {user_id} deleted.")
+        else:
+            print(f"Failed to delete user {user_id}.")
+
+def _h_delete_chat_history(connection_provider: SqliteConnectionProvider):
+    try:
+        user_id = int(input("User ID: ").strip())
+    except ValueError:
+        print("Invalid User ID. Please enter an integer.")
+        return
+    session_id = input("Session ID: ").strip()
+    
+    with connection_provider.pooled_connection() as conn:
+        chat_dao = conn.chat_dao
+        deleted = chat_dao.delete_chat_history(user_id, session_id)
+        if deleted:
+            print("Chat history deleted.")
+        else:
+            print("Failed to delete chat history.")
+
+def _h_insert_concurrently(connection_provider: SqliteConnectionProvider):
+    try:
+        num_workers = int(input("Number of worker processes: ").strip())
+        messages_per_worker = int(input("Messages per worker: ").strip())
+        num_shards = int(input("Number of chat database shards (1 = main database): ").strip())
+    except ValueError:
+        print("Invalid input. Please enter integers.")
+        return
+
+    # Several shards give each group of writers its own database file (and write lock)
+    if num_shards > 1:
+        chat_database_paths = [shard.database_path for shard in setup_chat_shards(num_shards, verbose=True).shards]
+    else:
+        chat_database_paths = [DB_PATH]
+
+    user_ids_for_test = []
+    session_ids_for_test = []
+
+    print("Creating users for concurrent test...")
+    with connection_provider.pooled_connection() as conn:
+        user_dao_single = conn.user_dao
+        ts = int(time.time()) # One timestamp for the run; 'i' keeps the names unique within it
+        for i in range(num_workers):
+            username = f"test_user_{i}_{ts}"
+            email = f"test_user_{i}_{ts}@example.com"
+            password_hash = f"hash{i}"
             
-        time.sleep(randint(0, 2) * 0.005) # Simulate some variable work
+            user_id = user_dao_single.insert_user(username, password_hash, email) # Returns the new ID
+            if user_id:
+                user_ids_for_test.append(user_id)
+                session_ids_for_test.append(f"session_dao_{i}")
+            else:
+                print(f"Warning: Failed to create user '{username}'. Skipping.")
+    
+    if len(user_ids_for_test) < num_workers:
+        print(f"Could only create {len(user_ids_for_test)} out of {num_workers} users. Running test with available users.")
+    
+    # Worker processes run truly in parallel (no GIL); each one opens its own connection
+    start_time = time.time()
+    # Workers log through the parent's queue listener (set up by start_logging())
+    log_queue = next((handler.queue for handler in logger.handlers
+                      if isinstance(handler, logging.handlers.QueueHandler)), None)
+    with ProcessPoolExecutor(max_workers=max(1, len(user_ids_for_test)),
+                             initializer=init_worker_logging, initargs=(log_queue, logger.level)) as executor:
+        futures = [executor.submit(insert_messages_process, chat_database_paths, user_ids_for_test[i], session_ids_for_test[i], messages_per_worker)
+                   for i in range(len(user_ids_for_test))]
+        results = [future.result() for future in futures]
+    end_time = time.time()
+
+    print(f"Concurrent message insertion complete. Total time: {end_time - start_time:.2f} seconds.")
+    print(f"Inserted {sum(results) * messages_per_worker} messages in total.")
+    failed_workers = results.count(False)
+    if failed_workers:
+        print(f"{failed_workers} worker(s) could not insert their messages (database stayed busy).")
+    if num_shards > 1:
+        print(f"Messages were written to the shard files {CHAT_SHARD_PATH.format('*')}, not to {DB_PATH}.")
+
+def _h_list_chat_history(connection_provider: SqliteConnectionProvider):
+    try:
+        user_id = int(input("User ID: ").strip())
+    except ValueError:
+        print("Invalid User ID. Please enter an integer.")
+        return
+    
+    with connection_provider.pooled_connection(read_only=True) as conn:
+        chat_dao = conn.chat_dao
+        # Rows are streamed in fetchmany() batches, so memory stays flat for large histories
+        found = False
+        for session_id, role, text in chat_dao.iter_all_chat_history_by_user(user_id):
+            if not found:
+                print(f"All chat messages for user {user_id}:")
+                found = True
+            print(f"  [Session:{session_id}] [Role:{role}] {text}")
+        if not found:
+            print("No messages found.")
+
+def _h_list_sessions(connection_provider: SqliteConnectionProvider):
+    try:
+        user_id = int(input("User ID: ").strip())
+    except ValueError:
+        print("Invalid User ID. Please enter an integer.")
+        return
+    
+    with connection_provider.pooled_connection(read_only=True) as conn:
+        chat_dao = conn.chat_dao
+        found = False
+        for session_id in chat_dao.iter_distinct_sessions_for_user(user_id): # Plain strings
+            if not found:
+                print(f"Distinct session IDs for user {user_id}:")
+                found = True
+            print(f"- {session_id}")
+        if not found:
+            print("No sessions found.")
+
+def _h_list_users(connection_provider: SqliteConnectionProvider):
+    with connection_provider.pooled_connection(read_only=True) as conn:
+        user_dao = conn.user_dao
+        users = user_dao.get_all()
+        if users:
+            for user_row in users:
+                print(f"- {user_row[0]},  {user_row[1]}") # id and username are the first two columns of the users table
+        else:
+            print("No user found.")
+
+# Menu choice -> (label, handler). One dict lookup replaces the if/elif chain.
+HANDLERS = {
+    "1": ("Create a new user", _h_create_user),
+    "2": ("Get user ID by username", _h_get_user_id),
+    "3": ("Add chat message", _h_add_chat_message),
+    "4": ("Get chat history for user and session", _h_get_chat_history),
+    "5": ("Delete a user", _h_delete_user),
+    "6": ("Delete chat history for user and session", _h_delete_chat_history),
+    "7": ("Insert multiple messages concurrently", _h_insert_concurrently),
+    "8": ("List all chat history for a user ", _h_list_chat_history),
+    "9": ("List all distinct session IDs for a user", _h_list_sessions),
+    "10": ("List all users", _h_list_users),
+}
 
 def menu_dao_test():
     # --- 1. Initial Setup ---
     print(f"--- DAO-only Test Script ---")
     if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+        SqliteConnectionProvider.remove_database_files(DB_PATH)
         print(f"Removed existing database file: {DB_PATH}")
 
     # Set up connection provider and ensure tables exist
     connection_provider = setup_db_and_daos(DB_PATH, verbose=True)
+    log_listener = start_logging(verbose=True)
 
     while True:
         print("\n=== DAO Test Menu ===")
-        print(" 1. Create a new user")
-        print(" 2. Get user ID by username")
-        print(" 3. Add chat message")
-        print(" 4. Get chat history for user and session")
-        print(" 5. Delete a user")
-        print(" 6. Delete chat history for user and session")
-        print(" 7. Insert multiple messages concurrently")
-        print(" 8. List all chat history for a user ")
-        print(" 9. List all distinct session IDs for a user")
-        print(" 10. List all users")
+        for key, (label, _) in HANDLERS.items():
+            print(f" {key}. {label}")
         print(" 0. Quit")
         
         choice = input("Enter your choice: ").strip()
 
         # --- 2. Perform Operations ---
-        if choice == "1":
-            username = input("Username: ").strip()
-            password_hash = input("Password hash: ").strip()
-            email = input("Email: ").strip()
-            
-            with connection_provider.get_connection() as conn:
-                user_dao = SqliteDaoUser(connection=conn, verbose=True)
-                inserted = user_dao.insert_user(username, password_hash, email)
-                if inserted:
-                    # After successful insert, get the ID (assuming unique username/email)
-                    user_data = user_dao.get_user_id_by_username(username)
-                    user_id = user_data['id'] if user_data else None
-                    print(f"User '{username}' created. ID: {user_id}")
-                else:
-                    print(f"Failed to create user '{username}'. (Might already exist)")
-
-        elif choice == "2":
-            username = input("Username to look up: ").strip()
-            with connection_provider.get_connection() as conn:
-                user_dao = SqliteDaoUser(connection=conn, verbose=True)
-                user_data = user_dao.get_user_id_by_username(username)
-                if user_data:
-                    print(f"User found: ID={user_data['id']}")
-                else:
-                    print(f"User '{username}' not found.")
-
-        elif choice == "3":
-            try:
-                user_id = int(input("User ID: ").strip())
-            except ValueError:
-                print("Invalid User ID. Please enter an integer.")
-                continue
-            session_id = input("Session ID: ").strip()
-            role = input("Role (e.g., 'user', 'bot'): ").strip()
-            text = input("Message text: ").strip()
-            
-            with connection_provider.get_connection() as conn:
-                chat_dao = SqliteDaoChat(connection=conn, verbose=True)
-                inserted = chat_dao.insert_chat_history(user_id, session_id, role, text)
-                if inserted:
-                    print(f"Message added for user {user_id}, session '{session_id}'.")
-                else:
-                    print("Failed to add message.")
-
-        elif choice == "4":
-            try:
-                user_id = int(input("User ID: ").strip())
-            except ValueError:
-                print("Invalid User ID. Please enter an integer.")
-                continue
-            session_id = input("Session ID: ").strip()
-            
-            with connection_provider.get_connection() as conn:
-                chat_dao = SqliteDaoChat(connection=conn, verbose=True)
-                messages = chat_dao.get_chat_history_for_user_and_session(user_id, session_id)
-                if messages:
-                    print(f"Chat history for user {user_id} session '{session_id}':")
-                    for msg in messages:
-                        print(f"  [Role:{msg['role']}] {msg['text']}")
-                else:
-                    print("No messages found.")
-
-        elif choice == "5":
-            try:
-                user_id = int(input("User ID to delete: ").strip())
-            except ValueError:
-                print("Invalid User ID. Please enter an integer.")
-                continue
-            
-            with connection_provider.get_connection() as conn:
-                user_dao = SqliteDaoUser(connection=conn, verbose=True)
-                deleted = user_dao.delete_user(user_id)
-                if deleted:
-                    print(f"User {user_id} deleted.")
-                else:
-                    print(f"Failed to delete user {user_id}.")
-
-        elif choice == "6":
-            try:
-                user_id = int(input("User ID: ").strip())
-            except ValueError:
-                print("Invalid User ID. Please enter an integer.")
-                continue
-            session_id = input("Session ID: ").strip()
-            
-            with connection_provider.get_connection() as conn:
-                chat_dao = SqliteDaoChat(connection=conn, verbose=True)
-                deleted = chat_dao.delete_chat_history(user_id, session_id)
-                if deleted:
-                    print("Chat history deleted.")
-                else:
-                    print("Failed to delete chat history.")
-
-        elif choice == "7":
-            try:
-                num_threads = int(input("Number of threads: ").strip())
-                messages_per_thread = int(input("Messages per thread: ").strip())
-            except ValueError:
-                print("Invalid input. Please enter integers.")
-                continue
-
-            user_ids_for_test = []
-            session_ids_for_test = []
-
-            print("Creating users for concurrent test...")
-            with connection_provider.get_connection() as conn:
-                user_dao_single = SqliteDaoUser(connection=conn, verbose=True)
-                for i in range(num_threads):
-                    username = f"test_user_{i}_{int(time.time())}"
-                    email = f"test_user_{i}_{int(time.time())}@example.com"
-                    password_hash = f"hash{i}"
-                    
-                    inserted = user_dao_single.insert_user(username, password_hash, email)
-                    if inserted:
-                        user_data = user_dao_single.get_user_id_by_username(username)
-                        user_id = user_data['id'] if user_data else None
-                        if user_id:
-                            user_ids_for_test.append(user_id)
-                            session_ids_for_test.append(f"session_dao_{i}")
-                        else:
-                            print(f"Warning: Could not retrieve ID for created user '{username}'. Skipping.")
-                    else:
-                        print(f"Warning: Failed to create user '{username}'. Skipping.")
-            
-            if len(user_ids_for_test) < num_threads:
-                print(f"Could only create {len(user_ids_for_test)} out of {num_threads} users. Running test with available users.")
-            
-            threads = []
-            start_time = time.time()
-            for i in range(len(user_ids_for_test)):
-                t = threading.Thread(target=insert_messages_dao, args=(connection_provider, user_ids_for_test[i], session_ids_for_test[i], messages_per_thread, False))
-                threads.append(t)
-                t.start()
-
-            for t in threads:
-                t.join()
-            end_time = time.time()
-
-            print(f"Concurrent message insertion complete. Total time: {end_time - start_time:.2f} seconds.")
-            print(f"Inserted {len(user_ids_for_test) * messages_per_thread} messages in total.")
-
-        elif choice == "8":
-            try:
-                user_id = int(input("User ID: ").strip())
-            except ValueError:
-                print("Invalid User ID. Please enter an integer.")
-                continue
-            
-            with connection_provider.get_connection() as conn:
-                chat_dao = SqliteDaoChat(connection=conn, verbose=True)
-                messages = chat_dao.get_all_chat_history_by_user(user_id)
-                if messages:
-                    print(f"All chat messages for user {user_id}:")
-                    for msg in messages:
-                        print(f"  [Session:{msg['session_id']}] [Role:{msg['role']}] {msg['text']}")
-                else:
-                    print("No messages found.")
-
-        elif choice == "9":
-            try:
-                user_id = int(input("User ID: ").strip())
-            except ValueError:
-                print("Invalid User ID. Please enter an integer.")
-                continue
-            
-            with connection_provider.get_connection() as conn:
-                chat_dao = SqliteDaoChat(connection=conn, verbose=True)
-                sessions = chat_dao.get_distinct_sessions_for_user(user_id)
-                if sessions:
-                    print(f"Distinct session IDs for user {user_id}:")
-                    for session_row in sessions:
-                        print(f"- {session_row[0]}") # sqlite3.Row returns a tuple for single column
-                else:
-                    print("No sessions found.")
-
-        elif choice == "10":
-            
-            
-            with connection_provider.get_connection() as conn:
-                user_dao = SqliteDaoUser(connection=conn, verbose=True)
-                users = user_dao.get_all()
-                if users:
-                    for user_row in users:
-                        print(f"- {user_row[SqliteDaoUser._field_id]},  {user_row[SqliteDaoUser._field_username]}") # sqlite3.Row returns a tuple for single column
-                else:
-                    print("No user found.")
-
-        elif choice == "0":
+        if choice == "0":
+            log_listener.stop()
             print("Exiting.")
             break
 
-        else:
+        entry = HANDLERS.get(choice)
+        if entry is None:
             print("Invalid choice, please try again.")
+            continue
+
+        label, handler = entry
+        start_ns = time.perf_counter_ns()
+        handler(connection_provider)
+        logger.debug("Option %s (%s) took %.3f ms", choice, label, (time.perf_counter_ns() - start_ns) / 1e6)
 
 if __name__ == "__main__":
-    menu_dao_test()
\ No newline at end of file
+    menu_dao_test()
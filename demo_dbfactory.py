@@ -3,6 +3,7 @@ import time
 from random import randint
 import os
 from  modules.impl.factories.SqliteDbFactory import SqliteDbFactory
+from modules.impl.connection.SqliteConnectionProvider import SqliteConnectionProvider
 
 # Define the database path
 DB_PATH = "database/test_factory.db"
@@ -25,8 +26,8 @@ def insert_messages(factory: SqliteDbFactory, user_id, session_id, num_messages,
 def menu():
     # Clean up old database before starting new test
     if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
         print(f"Removed existing database file: {DB_PATH}")
+    SqliteConnectionProvider.remove_database_files(DB_PATH) # Also removes the -wal/-shm side files
 
     factory = SqliteDbFactory(database_path=DB_PATH, verbose=True)
 
@@ -94,12 +95,14 @@ def menu():
                 continue
             session_id = input("Session ID: ").strip()
            
-            messages = factory.get_chat_history(user_id, session_id)
-            if messages:
-                print(f"Chat history for user {user_id} session '{session_id}':")
-                for role, text in messages:
-                    print(f"  [{role}] {text}")
-            else:
+            # Rows are streamed in batches, so memory stays flat for long sessions
+            found = False
+            for role, text in factory.iter_chat_history(user_id, session_id):
+                if not found:
+                    print(f"Chat history for user {user_id} session '{session_id}':")
+                    found = True
+                print(f"  [{role}] {text}")
+            if not found:
                 print("No messages found.")
 
         elif choice == "6":
@@ -140,9 +143,10 @@ def menu():
 
             # Create users for the threads
             print("Creating users for concurrent test...")
+            ts = int(time.time()) # One timestamp for the run; 'i' keeps the names unique within it
             for i in range(num_threads):
-                username = f"thread_user_{i}_{int(time.time())}" # Add timestamp for uniqueness
-                email = f"thread_user_{i}_{int(time.time())}@example.com"
+                username = f"thread_user_{i}_{ts}" # Add timestamp for uniqueness
+                email = f"thread_user_{i}_{ts}@example.com"
                 password_hash = f"hash{i}"
                 if factory.create_user(username, password_hash, email):
                     user_id = factory.get_user_id(username)
@@ -178,12 +182,13 @@ def menu():
                 print("Invalid User ID. Please enter an integer.")
                 continue
             # Corrected: Method name in factory
-            messages = factory.list_all_chat_history(user_id)
-            if messages:
-                print(f"All chat messages for user {user_id}:")
-                for session_id, role, text in messages:
-                    print(f"  [Session {session_id}] [{role}] {text}")
-            else:
+            found = False
+            for session_id, role, text in factory.iter_all_chat_history(user_id):
+                if not found:
+                    print(f"All chat messages for user {user_id}:")
+                    found = True
+                print(f"  [Session {session_id}] [{role}] {text}")
+            if not found:
                 print("No messages found.")
 
         elif choice == "10":
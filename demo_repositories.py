@@ -1,12 +1,12 @@
-import threading
 import time
-from random import randint
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
 # Import the necessary components from your layered architecture
 from modules.db.connection.IDbConnectionProvider import IDbConnectionProvider         # Interface for connection
 from modules.impl.connection.SqliteConnectionProvider import SqliteConnectionProvider # Concrete SQLite connection provider
+from modules.impl.connection.ShardedSqliteConnectionProvider import ShardedSqliteConnectionProvider # Chat shards
 from modules.impl.factories.SqliteRepositoryFactory import SqliteRepositoryFactory    # Factory for repositories
 from modules.impl.repositories.IUserRepository import IUserRepository                 # Interface for User Repository
 from modules.impl.repositories.IChatRepository import IChatRepository                 # Interface for Chat Repository
@@ -15,25 +15,32 @@ from modules.impl.models.ChatMessage import ChatMessage
 
 # Define the database path
 DB_PATH = "database/test_repository.db" # Using a different DB file for the new demo
+# Number of database files chat messages are spread over (shard = user_id % CHAT_SHARDS).
+# Set it above 1 to let writers of different shards run in parallel; chat IDs then become composite.
+CHAT_SHARDS = 1
+CHAT_SHARD_PATH = "database/test_repository_chat_{}.db"
+# Default number of messages each thread of menu option 7 writes per transaction
+FLUSH_SIZE = 200
 
-def insert_messages_repo(chat_repo: IChatRepository, user_id: int, session_id: str, num_messages: int, verbose: bool = False):
+def insert_messages_repo(chat_repo: IChatRepository, user_id: int, session_id: str, num_messages: int, verbose: bool = False, flush_every: Optional[int] = FLUSH_SIZE):
     """
     Function to be run by threads to insert multiple chat messages using the ChatRepository.
+    Messages are accumulated and flushed with add_many() every 'flush_every' messages,
+    so there is one transaction (and one commit) per chunk instead of one per message.
+    With flush_every=None, all messages are written with a single add_many().
     """
-    for i in range(num_messages):
-        role = "user"
-        text = f"Message {i} from user {user_id} in session {session_id}"
-        
-        # Create a ChatMessage object
-        message = ChatMessage(user_id=user_id, session_id=session_id, role=role, text=text)
-        
-        # Use the repository to add the message
-        message_id = chat_repo.add(message)
-        
+    flush_every = flush_every or num_messages
+    role = "user"
+    for start in range(0, num_messages, flush_every):
+        # Create the ChatMessage objects of this chunk
+        chunk = [ChatMessage(user_id=user_id, session_id=session_id, role=role,
+                             text=f"Message {i} from user {user_id} in session {session_id}")
+                 for i in range(start, min(start + flush_every, num_messages))]
+
+        # Use the repository to add the whole chunk at once
+        inserted = chat_repo.add_many(chunk)
         if verbose:
-            print(f"{'Inserted' if message_id else 'Failed to insert'}: {text} (ID: {message_id})") 
-        
-        time.sleep(randint(0, 2) * 0.01) # Simulate some variable work
+            print(f"{'Inserted' if inserted else 'Failed to insert'} {len(chunk)} messages for user {user_id} in session {session_id}")
 
 def init_data(repo_factory: SqliteRepositoryFactory):
     """
@@ -47,32 +54,40 @@ def init_data(repo_factory: SqliteRepositoryFactory):
     test_user = User(username="test_user", password_hash="hash123", email="test@email.com")
     user_id = user_repo.add(test_user)
 
-    chat_message = ChatMessage(
-        user_id=user_id,
-        session_id="123",
-        role="user",
-        text="Hello, this is a test message."
-    )
-    chat_repo.add(chat_message)
-    chat_message = ChatMessage(
-        user_id=user_id,
-        session_id="123",
-        role="model",
-        text="Hello, this is a test response."
-    )
-    chat_repo.add(chat_message)
+    # Both messages are written with one statement in one transaction
+    chat_repo.add_many([
+        ChatMessage(
+            user_id=user_id,
+            session_id="123",
+            role="user",
+            text="Hello, this is a test message."
+        ),
+        ChatMessage(
+            user_id=user_id,
+            session_id="123",
+            role="model",
+            text="Hello, this is a test response."
+        ),
+    ])
 
 def menu_repo():
     # Clean up old database before starting new test
     if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
         print(f"Removed existing database file: {DB_PATH}")
+    SqliteConnectionProvider.remove_database_files(DB_PATH) # Also removes the -wal/-shm side files
 
     # Initialize the lowest-level connection provider with SQLite provider
     db_connection_provider: IDbConnectionProvider = SqliteConnectionProvider(database_path=DB_PATH)
+
+    chat_shards = None
+    if CHAT_SHARDS > 1:
+        shard_paths = [CHAT_SHARD_PATH.format(i) for i in range(CHAT_SHARDS)]
+        for path in shard_paths:
+            SqliteConnectionProvider.remove_database_files(path)
+        chat_shards = ShardedSqliteConnectionProvider(shard_paths)
     
     # Initialize the Repository Factory with the connection provider
-    repo_factory = SqliteRepositoryFactory(db_connection_provider)
+    repo_factory = SqliteRepositoryFactory(db_connection_provider, chat_shards)
     
     # Initialize database tables via the RepositoryFactory (which delegates to DAOs)
     repo_factory.initialize_database_tables()
@@ -180,11 +195,11 @@ def menu_repo():
                 continue
             session_id = input("Session ID: ").strip()
             
-            # Assuming a delete_messages_by_session_id method exists in ChatRepository
-            if chat_repo.delete_messages_by_session_id(session_id):
-                print("Chat history deleted.")
-            else:
+            deleted = chat_repo.delete_messages_by_session_id(user_id, session_id)
+            if deleted is None:
                 print("Failed to delete chat history.")
+            else:
+                print(f"Chat history deleted ({deleted} messages).")
 
         elif choice == "7":
             try:
@@ -198,32 +213,36 @@ def menu_repo():
             session_ids = []
 
             print("Creating users for concurrent test...")
-            for i in range(num_threads):
-                username = f"thread_user_{i}_{int(time.time())}"
-                email = f"thread_user_{i}_{int(time.time())}@example.com"
-                password_hash = f"hash{i}"
-                
-                new_user = User(username=username, password_hash=password_hash, email=email)
-                user_id = user_repo.add(new_user)
+            ts = int(time.time()) # One timestamp for the run; 'i' keeps the names unique within it
+            new_users = [User(username=f"thread_user_{i}_{ts}",
+                              password_hash=f"hash{i}",
+                              email=f"thread_user_{i}_{ts}@example.com")
+                         for i in range(num_threads)]
+            # All users are inserted in one transaction before any thread starts
+            for i, (new_user, user_id) in enumerate(zip(new_users, user_repo.add_many(new_users))):
                 if user_id:
-                    user_ids.append(new_user.id) # Use the ID updated in the User object
+                    user_ids.append(user_id)
                     session_ids.append(f"session_repo_{i}")
                 else:
-                    print(f"Warning: Failed to create user '{username}'. Skipping.")
+                    print(f"Warning: Failed to create user '{new_user.username}'. Skipping.")
             
             if len(user_ids) < num_threads:
                 print(f"Could only create {len(user_ids)} out of {num_threads} users. Running test with available users.")
             
-            threads = []
+            # A bounded pool: extra users queue up as tasks instead of each getting a new thread.
+            # Writes are serialized by the writer thread anyway, so more threads would only add overhead.
+            max_workers = max(1, min(len(user_ids), (os.cpu_count() or 1) * 2))
             start_time = time.time()
-            for i in range(len(user_ids)):
-                # Pass the chat_repo instance, user_id, session_id
-                t = threading.Thread(target=insert_messages_repo, args=(chat_repo, user_ids[i], session_ids[i], messages_per_thread, True))
-                threads.append(t)
-                t.start()
+            def insert_task(user_id, session_id):
+                # Each worker thread uses its own repository (and connection), handed back when the task ends
+                try:
+                    insert_messages_repo(repo_factory.get_chat_repository(), user_id, session_id, messages_per_thread, True)
+                finally:
+                    repo_factory.close_thread_repositories()
 
-            for t in threads:
-                t.join()
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # list() surfaces worker exceptions
+                list(executor.map(insert_task, user_ids, session_ids))
             end_time = time.time()
 
             print(f"Concurrent message insertion complete. Total time: {end_time - start_time:.2f} seconds.")
@@ -236,13 +255,14 @@ def menu_repo():
                 print("Invalid User ID. Please enter an integer.")
                 continue
             
-            # Assuming get_all_chat_history_by_user method exists in ChatRepository
-            messages: List[ChatMessage] = chat_repo.get_all_chat_history_by_user(user_id)
-            if messages:
-                print(f"All chat messages for user {user_id}:")
-                for msg in messages:
-                    print(f"  [ID:{msg.id}] [Session:{msg.session_id}] [{msg.role}] {msg.text} (Time: {msg.timestamp})")
-            else:
+            # Messages are streamed from the database in batches instead of loaded into a list
+            found = False
+            for msg in chat_repo.iter_messages_by_user(user_id):
+                if not found:
+                    print(f"All chat messages for user {user_id}:")
+                    found = True
+                print(f"  [ID:{msg.id}] [Session:{msg.session_id}] [{msg.role}] {msg.text}")
+            if not found:
                 print("No messages found.")
 
         elif choice == "9":
@@ -272,14 +292,17 @@ def menu_repo():
                 print("No users found.")
         elif choice == "11":
             # List all chat messages
-            messages: List[ChatMessage] = chat_repo.get_all()
-            if messages:
-                print("All chat messages:")
-                for msg in messages:
-                    print(f"ID: {msg.id}, User ID: {msg.user_id}, Session ID: {msg.session_id}, Role: {msg.role}, Text: {msg.text}")
-            else:
+            found = False
+            for msg in chat_repo.iter_all():
+                if not found:
+                    print("All chat messages:")
+                    found = True
+                print(f"ID: {msg.id}, User ID: {msg.user_id}, Session ID: {msg.session_id}, Role: {msg.role}, Text: {msg.text}")
+            if not found:
                 print("No chat messages found.")
         elif choice == "0":
+            repo_factory.stop_writer() # Flush pending writes before leaving
+            repo_factory.close_thread_repositories()
             print("Exiting.")
             break
 
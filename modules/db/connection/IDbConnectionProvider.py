@@ -23,4 +23,18 @@ class IDbConnectionProvider(ABC):
         It is the responsibility of the caller to manage (e.g., close) this connection
         unless the implementation handles connection pooling/management internally.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def get_read_connection(self) -> Any:
+        """
+        Provides a connection meant only for reads.
+        Implementations may return a cheaper or less contended connection
+        (e.g., a read-only one). Defaults to get_connection().
+        """
+        return self.get_connection()
+
+    def get_write_connection(self) -> Any:
+        """
+        Provides a connection meant for writes. Defaults to get_connection().
+        """
+        return self.get_connection()
@@ -5,8 +5,7 @@
   See the LICENSE file for details.
 """
 from abc import ABC, abstractmethod
-import threading
-from typing import Any, List, Tuple, Union, Optional, Dict
+from typing import Any, List, Tuple, Union, Optional, Dict, Iterator
 
 class AbstractDao(ABC):
     """
@@ -21,9 +20,6 @@ class AbstractDao(ABC):
         """
         self.conn = connection
         self.verbose = verbose
-        # This lock is generic for Python-level synchronization, useful if connection
-        # objects are shared across threads, regardless of the specific database.
-        self._write_lock = threading.Lock()
 
     @abstractmethod
     def _ensure_connected(self):
@@ -42,19 +38,66 @@ class AbstractDao(ABC):
         pass
 
     @abstractmethod
-    def execute_query(self, query: str, params: Optional[Tuple] = None, fetch_one: bool = False, fetch_all: bool = False) -> Union[Any, List[Any], None]:
+    def execute_query(self, query: str, params: Optional[Tuple] = None, fetch_one: bool = False, fetch_all: bool = False, scalar: bool = False, tuples: bool = False) -> Union[Any, List[Any], None]:
         """
         Abstract method to execute a read query on the database.
         Does NOT commit changes. Returns raw database-specific results (e.g., rows from driver).
+        With scalar=True, each row is returned as the bare value of its first column.
+        With tuples=True, each row is a plain tuple in SELECT column order.
         The return type 'Any' is used as the exact row/result type varies by database driver.
         """
         pass
     
     @abstractmethod
-    def _execute_with_retry(self, query: str, params: Optional[Tuple] = None, max_retries: int = 5, retry_delay: float = 0.1) -> bool:
+    def execute_query_as_dicts(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
+        """
+        Abstract method to execute a read query and return every row as a dictionary
+        keyed by column name.
+        """
+        pass
+
+    @abstractmethod
+    def execute_query_as_columns(self, query: str, params: Optional[Tuple] = None) -> Dict[str, List[Any]]:
+        """
+        Abstract method to execute a read query and return its result column by column:
+        one list of values per column name.
+        """
+        pass
+
+    @abstractmethod
+    def iter_query(self, query: str, params: Optional[Tuple] = None, batch_size: int = 1000, scalar: bool = False, tuples: bool = False) -> Iterator[Any]:
+        """
+        Abstract method to execute a read query and yield its rows one at a time,
+        fetching them from the driver 'batch_size' rows at a time instead of all at once.
+        """
+        pass
+
+    @abstractmethod
+    def _execute_with_retry(self, query: str, params: Optional[Tuple] = None, fetch_one: bool = False, rowcount: bool = False) -> Union[bool, int, Any, None]:
         """
         Abstract helper method to execute a write query (INSERT, UPDATE, DELETE)
-        with retry logic for database-specific locking/concurrency issues.
+        handling database-specific locking/concurrency issues (e.g., waiting on a busy database).
         Handles commit/rollback for the specific operation.
+        With fetch_one=True (e.g., INSERT ... RETURNING), returns the first result row
+        (or None) instead of a success flag. With rowcount=True, returns the number of
+        rows the statement changed (or None on failure).
+        """
+        pass
+
+    @abstractmethod
+    def _execute_many_with_retry(self, query: str, seq_params: List[Tuple]) -> bool:
+        """
+        Abstract helper method to execute one write query for every parameter tuple
+        in 'seq_params' as a single batch, with the same lock handling as _execute_with_retry.
+        The whole batch is committed (or rolled back) at once.
         """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def transaction(self, mode: str = "IMMEDIATE"):
+        """
+        Abstract context manager grouping several DAO calls into a single transaction.
+        Commits on success and rolls back on error. Write helpers called inside it
+        must join the open transaction instead of committing on their own.
+        """
+        pass
@@ -7,8 +7,8 @@
 """
 from modules.db.dao.AbstractDao import AbstractDao
 import sqlite3
-import time
 import threading
+from contextlib import contextmanager
 
 class SqliteDao(AbstractDao):
     """
@@ -16,6 +16,27 @@ class SqliteDao(AbstractDao):
     This class provides basic database operations such as checking table existence,
     executing queries, and handling database locks.
     Subclasses should implement specific DAO functionality."""
+
+    # Tuning applied once to a connection the DAO did not get from SqliteConnectionProvider
+    # (provider connections are already configured, see SqliteConnectionProvider.CONNECTION_PRAGMAS).
+    CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode = WAL;",    # Readers no longer block the writer (persistent in the file)
+        "PRAGMA synchronous = NORMAL;",  # Safe with WAL, removes one fsync per commit
+        "PRAGMA busy_timeout = 5000;",   # Wait inside SQLite on a locked database
+        "PRAGMA temp_store = MEMORY;",
+        "PRAGMA cache_size = -65536;",   # ~64 MB page cache
+    )
+
+    # INSERT ... RETURNING needs SQLite 3.35+. DAOs fall back to a plain INSERT on older libraries,
+    # and fetch_one then yields (cursor.lastrowid,) instead of a returned row.
+    RETURNING_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+    # BEGIN statement of each transaction mode, built once instead of formatted per transaction
+    _SQL_BEGIN = {mode: f"BEGIN {mode}" for mode in ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")}
+
+    # Maximum number of cursors execute_query keeps per thread (one per distinct query string).
+    CURSOR_CACHE_SIZE = 64
+
     def __init__(self,connection: sqlite3.Connection = None,verbose: bool = False):
         """
         Initialize the DAO with a database connection.  
@@ -23,13 +44,41 @@ class SqliteDao(AbstractDao):
             :param verbose: If True, print debug information. Default is False.
         """
         super().__init__(connection=connection, verbose=verbose)
-        self._write_lock = threading.Lock()
         self.verbose = verbose
+        self._pragmas_applied = False
+        # Serializes transactions per connection: connections from SqliteConnectionProvider carry
+        # one lock shared by all their DAOs; other connections fall back to a lock for this DAO only.
+        self._write_lock = getattr(connection, "write_lock", None) or threading.RLock()
+        self.writer = None # Optional SqliteWriter: when set, writes are queued to its single writer thread
+        self._local = threading.local() # Per-thread cursors reused by execute_query (cursors are not thread-safe)
 
 
     def _ensure_connected(self):
         if self.conn is None:
             raise Exception(f"{self.__class__.__name__}::Error -> not connected. Provide a connection during initialization or ensure it's set.")
+        if not self._pragmas_applied:
+            self._apply_pragmas()
+
+    def _apply_pragmas(self):
+        """
+        Configure the connection on first use: autocommit mode (isolation_level=None), so
+        transactions are only opened by explicit BEGIN (see transaction()), and CONNECTION_PRAGMAS.
+        Skipped for connections already configured by SqliteConnectionProvider, and for a
+        connection with an open transaction (the journal mode cannot change inside one).
+        """
+        self._pragmas_applied = True
+        if getattr(self.conn, "pragmas_applied", False) or self.conn.in_transaction:
+            return
+
+        self.conn.isolation_level = None
+        for pragma in self.CONNECTION_PRAGMAS:
+            try:
+                self.conn.execute(pragma)
+            except sqlite3.OperationalError as e: # e.g., journal_mode on a read-only database
+                if self.verbose:
+                    print(f"{self.__class__.__name__}::Could not apply '{pragma}': {e}")
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Connection configured (autocommit, WAL, busy_timeout).")
 
     def is_table_exist(self, table_name: str):
         """Check if a table exists in the database."""
@@ -44,18 +93,94 @@ class SqliteDao(AbstractDao):
             print(f"{self.__class__.__name__}::Checking if table '{table_name}' exists: {result is not None}")
         return result is not None
 
-    def execute_query(self, query: str, params=None, fetch_one=False, fetch_all=False):
-        """Execute a query on the database. Does NOT commit changes."""
+    @contextmanager
+    def transaction(self, mode: str = "IMMEDIATE"):
+        """
+        Run the enclosed DAO calls in a single transaction on this DAO's connection.
+        If a transaction is already open on the connection, the block joins it and
+        leaves commit/rollback to whoever opened it.
+        The connection's write lock is held for the whole block, so another thread sharing
+        the connection waits for the transaction to finish instead of joining it.
+            :param mode: SQLite BEGIN mode ("DEFERRED", "IMMEDIATE" or "EXCLUSIVE"). Default "IMMEDIATE".
+        """
+        self._ensure_connected()
+        with self._write_lock:
+            if self.conn.in_transaction:
+                yield self.conn
+                return
+
+            self.conn.execute(self._SQL_BEGIN.get(mode) or f"BEGIN {mode}")
+            try:
+                yield self.conn
+                self.conn.commit()
+            except BaseException:
+                # Also reached when COMMIT itself fails, so the transaction is never left open
+                self.conn.rollback()
+                raise
+
+    @staticmethod
+    def _first_column(cursor, row):
+        """Row factory returning a row's first column as a plain value (no sqlite3.Row wrapper)."""
+        return row[0]
+
+    @staticmethod
+    def _fetch_one_or_lastrowid(cursor):
+        """
+        First returned row, or (lastrowid,) when the statement returns no columns (no RETURNING).
+        None when nothing was inserted (e.g., ON CONFLICT DO NOTHING skipped the row).
+        """
+        if cursor.description is None:
+            return (cursor.lastrowid,) if cursor.rowcount > 0 else None
+        return cursor.fetchone()
+
+    def _cached_cursor(self, query: str) -> sqlite3.Cursor:
+        """
+        Cursor kept for 'query' by the calling thread, created on first use.
+        Only for statements run to the end (fetch_all reads, writes without RETURNING): a cursor
+        left on an unfinished SELECT keeps its statement active, and with it the connection's
+        read snapshot.
+        """
+        cursors = getattr(self._local, "cursors", None)
+        if cursors is None:
+            cursors = self._local.cursors = {}
+        cursor = cursors.get(query)
+        if cursor is None:
+            cursor = self.conn.cursor()
+            if len(cursors) < self.CURSOR_CACHE_SIZE:
+                cursors[query] = cursor
+        return cursor
+
+    def _row_factory(self, scalar: bool, tuples: bool):
+        """Row factory for a read: first column only, plain tuples, or the connection's own (sqlite3.Row)."""
+        if scalar:
+            return self._first_column
+        if tuples:
+            return None
+        return self.conn.row_factory
+
+    def execute_query(self, query: str, params=None, fetch_one=False, fetch_all=False, scalar=False, tuples=False):
+        """
+        Execute a query on the database. Does NOT commit changes.
+        With scalar=True, each row is returned as the bare value of its first column.
+        With tuples=True, rows are plain tuples (no sqlite3.Row), for callers reading them by position.
+        fetch_all queries reuse a cursor kept per thread and query string.
+        """
         self._ensure_connected()
 
         if self.verbose:
             print(f"{self.__class__.__name__}::Executing query: {query} with params: {params}")
 
-        cursor = self.conn.cursor()
-        if params is None:
-            params = ()
-        cursor.execute(query, params)
-        
+        if fetch_all and not fetch_one:
+            # fetchall() always runs the statement to completion, so the cursor can be kept
+            cursor = self._cached_cursor(query)
+            cursor.row_factory = self._row_factory(scalar, tuples)
+            cursor.execute(query, params if params is not None else ())
+        else:
+            # Connection.execute() creates and runs the cursor in one C call
+            cursor = self.conn.execute(query, params if params is not None else ())
+            if scalar or tuples:
+                cursor.row_factory = self._row_factory(scalar, tuples) # Overrides the connection's sqlite3.Row; applied when fetching
+
         result = None
         if fetch_one:
             result = cursor.fetchone()
@@ -67,32 +192,151 @@ class SqliteDao(AbstractDao):
         # Do not commit here, let the caller or context manager handle it
         return result
     
-    def _execute_with_retry(self, query, params=None, max_retries=5, retry_delay=0.1):
-        """Helper to execute a query with retry logic for locked databases."""
+    def execute_query_as_dicts(self, query: str, params=None):
+        """
+        Execute a read query and return its rows as dictionaries keyed by column name.
+        Rows are fetched as plain tuples and zipped with the column names read once from
+        cursor.description, instead of converting each sqlite3.Row with dict(row).
+            :param query: SQL query to execute.
+            :param params: Query parameters. Default None.
+        """
+        self._ensure_connected()
+
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Executing query: {query} with params: {params}")
+
+        cursor = self.conn.execute(query, params if params is not None else ())
+        cursor.row_factory = None # Plain tuples instead of the connection's sqlite3.Row
+        columns = tuple(description[0] for description in cursor.description)
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def execute_query_as_columns(self, query: str, params=None):
+        """
+        Execute a read query and return its result column by column (structure of arrays):
+        {column name: [value of each row]}. No per-row object is kept, so callers aggregating
+        over many rows (counts, joins of texts) work on plain lists.
+            :param query: SQL query to execute.
+            :param params: Query parameters. Default None.
+        """
+        self._ensure_connected()
+
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Executing query: {query} with params: {params}")
+
+        cursor = self.conn.execute(query, params if params is not None else ())
+        cursor.row_factory = None # Plain tuples instead of the connection's sqlite3.Row
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            return {column: [] for column in columns}
+        return {column: list(values) for column, values in zip(columns, zip(*rows))}
+
+    def iter_query(self, query: str, params=None, batch_size: int = 1000, scalar: bool = False, tuples: bool = False):
+        """
+        Execute a read query and yield its rows one by one.
+        Rows are pulled from SQLite with fetchmany(batch_size), so memory stays
+        bounded by one batch however large the result set is.
+        The connection must stay open until the generator is exhausted.
+            :param query: SQL query to execute.
+            :param params: Query parameters. Default None.
+            :param batch_size: Number of rows fetched per fetchmany() call. Default 1000.
+            :param scalar: If True, yield the bare value of each row's first column. Default False.
+            :param tuples: If True, yield plain tuples instead of sqlite3.Row. Default False.
+        """
+        self._ensure_connected()
+
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Streaming query: {query} with params: {params}")
+
+        cursor = self.conn.cursor()
+        cursor.row_factory = self._row_factory(scalar, tuples)
+        cursor.arraysize = batch_size
+        cursor.execute(query, params if params is not None else ())
+        try:
+            while True:
+                batch = cursor.fetchmany()
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            cursor.close()
+
+    def _execute_with_retry(self, query, params=None, fetch_one=False, rowcount=False):
+        """
+        Helper to execute a write query in its own transaction (or in the caller's open one).
+        Waiting on a locked database is left to SQLite's busy handler (PRAGMA busy_timeout),
+        which blocks in C instead of sleeping and retrying in Python.
+        Returns True on success, False if the database stayed locked. Inside a caller's
+        transaction the locked error is re-raised instead. With fetch_one=True
+        (e.g., INSERT ... RETURNING), returns the first result row instead, or None on failure;
+        for a statement returning no columns (a plain INSERT), that row is (cursor.lastrowid,).
+        With rowcount=True, returns the number of rows changed by the statement (e.g., deleted),
+        or None on failure.
+        """
         self._ensure_connected()
         if self.verbose:
             print(f"{self.__class__.__name__}::Executing with retry: {query} with params: {params}")
 
-        attempt = 0
-        while attempt < max_retries:
-            try:
-                with self._write_lock: # Assuming all writes need this lock
-                    with self.conn: # This context manager handles commit/rollback
-                        self.conn.execute(query, params if params is not None else ())
+        if self.writer is not None and not self.conn.in_transaction:
+            # The writer thread serializes and batches writes.
+            # Inside a caller's transaction the write must stay on this connection instead.
+            return self.writer.submit_and_wait(query, params, fetch_one=fetch_one, rowcount=rowcount)
 
-                if self.verbose:
-                    print(f"{self.__class__.__name__}::Query executed successfully on attempt {attempt + 1}.")
-                return True
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e):
-                    attempt += 1
-                    if self.verbose:
-                        print(f"{self.__class__.__name__}::Database is locked, retrying {attempt}/{max_retries}...")
-                    time.sleep(retry_delay)
+        joined = self.conn.in_transaction
+        try:
+            with self.transaction(): # Commits/rolls back, or joins the caller's transaction
+                if fetch_one:
+                    cursor = self.conn.execute(query, params if params is not None else ())
+                    result = self._fetch_one_or_lastrowid(cursor) # Read before the commit
                 else:
-                    if self.verbose:
-                        print(f"{self.__class__.__name__}::SQLite error: {e}")
-                    raise # Re-raise unexpected errors
+                    # A write returning no rows completes within execute(), so its cursor can be kept
+                    cursor = self._cached_cursor(query)
+                    cursor.execute(query, params if params is not None else ())
+                    result = cursor.rowcount if rowcount else True
+        except sqlite3.OperationalError as e:
+            if "database is locked" not in str(e):
+                if self.verbose:
+                    print(f"{self.__class__.__name__}::SQLite error: {e}")
+                raise # Re-raise unexpected errors
+            if joined:
+                raise # The caller's transaction must see the failure and roll back as a whole
+            if self.verbose:
+                print(f"{self.__class__.__name__}::Database still locked after busy_timeout: {e}")
+            return None if fetch_one or rowcount else False
+
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Query executed successfully.")
+        return result
+
+    def _execute_many_with_retry(self, query, seq_params):
+        """
+        Helper to execute a write query once per parameter tuple, in one transaction.
+        Like _execute_with_retry, waiting on a locked database is left to busy_timeout.
+        Returns True on success, False if the database stayed locked (re-raised inside a
+        caller's transaction).
+        """
+        self._ensure_connected()
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Executing many with retry: {query} for {len(seq_params)} rows")
+
+        if self.writer is not None and not self.conn.in_transaction:
+            return self.writer.submit_and_wait(query, seq_params, many=True)
+
+        joined = self.conn.in_transaction
+        try:
+            with self.transaction(): # One commit for the whole batch
+                self._cached_cursor(query).executemany(query, seq_params)
+        except sqlite3.OperationalError as e:
+            if "database is locked" not in str(e):
+                if self.verbose:
+                    print(f"{self.__class__.__name__}::SQLite error: {e}")
+                raise # Re-raise unexpected errors
+            if joined:
+                raise # The caller's transaction must see the failure and roll back as a whole
+            if self.verbose:
+                print(f"{self.__class__.__name__}::Database still locked after busy_timeout: {e}")
+            return False
+
         if self.verbose:
-            print(f"{self.__class__.__name__}::Failed to execute after retries.")
-        return False
\ No newline at end of file
+            print(f"{self.__class__.__name__}::Batch executed successfully.")
+        return True
@@ -0,0 +1,204 @@
+"""
+  Copyright (c) 2025 Alexandre Kavadias
+
+  This project is licensed under the Educational and Non-Commercial Use License.
+  See the LICENSE file for details.
+"""
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Optional, Sequence
+
+try:
+    # Native drop-in for queue.Queue; cheaper hand-offs on free-threaded CPython (3.13t+)
+    import mbqueue
+    _Queue = mbqueue.Queue
+    _Empty = getattr(mbqueue, "Empty", queue.Empty)
+except ImportError:
+    _Queue = queue.Queue
+    _Empty = queue.Empty
+
+# Queued to make the writer thread exit once everything submitted before it is written
+_STOP = object()
+
+class _WriteOp:
+    """A single write waiting in the queue, with the Future its submitter waits on."""
+    __slots__ = ("query", "params", "many", "fetch_one", "rowcount", "future")
+
+    def __init__(self, query: str, params: Any, many: bool, fetch_one: bool, rowcount: bool = False):
+        self.query = query
+        self.params = params
+        self.many = many
+        self.fetch_one = fetch_one
+        self.rowcount = rowcount
+        self.future = Future()
+
+class SqliteWriter(threading.Thread):
+    """
+    Single writer thread for a SQLite database.
+    SQLite allows one writer at a time, so instead of every thread competing for the write
+    lock (and retrying when it is busy), threads submit their writes to this thread's queue.
+    The writer owns one connection, drains whatever is queued (up to max_batch operations)
+    and writes it in a single BEGIN IMMEDIATE ... COMMIT: one commit is paid for the whole batch.
+    The queue is mbqueue.Queue when that package is installed, queue.Queue otherwise.
+
+    Each operation runs in its own SAVEPOINT, so a failing operation (e.g., a UNIQUE violation)
+    is undone alone and reported to its submitter, while the rest of the batch still commits.
+    """
+    MAX_BATCH = 500
+
+    def __init__(self, connection: sqlite3.Connection, max_batch: int = MAX_BATCH, verbose: bool = False):
+        """
+        Initialize the writer. Call start() before submitting.
+            :param connection: Connection used only by the writer thread. It must be in autocommit
+                               mode (isolation_level=None) and opened with check_same_thread=False.
+            :param max_batch: Maximum number of operations written in one transaction. Default 500.
+            :param verbose: If True, print debug information. Default is False.
+        """
+        super().__init__(name="SqliteWriter", daemon=True)
+        self.conn = connection
+        self.max_batch = max_batch
+        self.verbose = verbose
+        self.q = _Queue()
+        # Guards 'closed': once the thread has exited, submit() refuses new writes
+        self._submit_lock = threading.Lock()
+        self.closed = False
+
+    def submit(self, query: str, params: Optional[Sequence] = None, fetch_one: bool = False, many: bool = False, rowcount: bool = False) -> Future:
+        """
+        Queue a write and return immediately.
+            :param query: SQL statement (INSERT, UPDATE, DELETE).
+            :param params: Statement parameters, or a list of parameter tuples when many=True.
+            :param fetch_one: If True, the result is the first row returned (e.g., INSERT ... RETURNING),
+                              or (lastrowid,) for a statement that returns no columns.
+            :param many: If True, run the statement with executemany() over 'params'.
+            :param rowcount: If True, the result is the number of rows the statement changed.
+            :return: Future resolved with True (or the fetched row, or the row count) once the batch is committed.
+            :raises RuntimeError: If the writer thread is not running (not started yet, stopped or dead).
+        """
+        op = _WriteOp(query, params if params is not None else (), many, fetch_one, rowcount)
+        with self._submit_lock:
+            if self.closed or not self.is_alive():
+                raise RuntimeError(f"{self.__class__.__name__}::Writer thread is not running.")
+            self.q.put(op)
+        return op.future
+
+    def submit_and_wait(self, query: str, params: Optional[Sequence] = None, fetch_one: bool = False, many: bool = False, rowcount: bool = False) -> Any:
+        """
+        Queue a write and block until it is committed.
+        Returns the operation's result, or raises the error it failed with.
+        """
+        return self.submit(query, params, fetch_one=fetch_one, many=many, rowcount=rowcount).result()
+
+    def stop(self):
+        """Writes everything already queued, then ends the thread and waits for it."""
+        if self.is_alive():
+            self.q.put(_STOP)
+            self.join()
+
+    def run(self):
+        try:
+            self._loop()
+        finally:
+            self._fail_pending()
+
+    def _loop(self):
+        while True:
+            op = self.q.get()
+            if op is _STOP:
+                break
+            batch = [op]
+            stopping = False
+            # Take whatever else is already waiting; no lingering, so a lone write is not delayed
+            while len(batch) < self.max_batch:
+                try:
+                    op = self.q.get_nowait()
+                except _Empty:
+                    break
+                if op is _STOP:
+                    stopping = True
+                    break
+                batch.append(op)
+            self._write_batch(batch)
+            if stopping:
+                break
+
+    def _fail_pending(self):
+        """
+        Called when the thread exits: refuses new submits and fails every write still queued,
+        so no caller of submit_and_wait() is left blocked on a Future nobody will resolve.
+        """
+        with self._submit_lock:
+            self.closed = True
+        error = RuntimeError(f"{self.__class__.__name__}::Writer thread stopped before the write was run.")
+        while True:
+            try:
+                op = self.q.get_nowait()
+            except _Empty:
+                break
+            if op is not _STOP and not op.future.done():
+                op.future.set_exception(error)
+
+    def _write_batch(self, batch):
+        """
+        Runs a batch of operations in one transaction and resolves their futures.
+        Any failure outside a single operation (BEGIN, COMMIT, an unexpected error) rolls the
+        batch back and fails every future, so no submitter is left waiting and the thread keeps running.
+        KeyboardInterrupt and SystemExit still end the thread, once the batch has been failed.
+        """
+        try:
+            outcomes = self._run_batch(batch)
+        except BaseException as e:
+            if self.conn.in_transaction:
+                try:
+                    self.conn.rollback()
+                except sqlite3.Error:
+                    pass
+            for op in batch:
+                if not op.future.done():
+                    op.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise # run() then fails whatever is still queued
+            return
+
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Committed a batch of {len(batch)} operations.")
+        for op, result, error in outcomes:
+            if error is None:
+                op.future.set_result(result)
+            else:
+                op.future.set_exception(error)
+
+    def _run_batch(self, batch):
+        """Writes the batch between BEGIN IMMEDIATE and COMMIT; returns (op, result, error) per operation."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        outcomes = []
+        for op in batch:
+            self.conn.execute("SAVEPOINT write_op")
+            try:
+                if op.many:
+                    self.conn.executemany(op.query, op.params)
+                    result = True
+                else:
+                    cursor = self.conn.execute(op.query, op.params)
+                    try:
+                        if op.rowcount:
+                            result = cursor.rowcount
+                        elif not op.fetch_one:
+                            result = True
+                        elif cursor.description is None: # Plain INSERT (no RETURNING on SQLite < 3.35)
+                            result = (cursor.lastrowid,) if cursor.rowcount > 0 else None
+                        else:
+                            result = cursor.fetchone()
+                    finally:
+                        cursor.close() # Resets a RETURNING statement, which would otherwise block RELEASE
+                self.conn.execute("RELEASE write_op")
+                outcomes.append((op, result, None))
+            except Exception as e: # Reported to this op's submitter only
+                self.conn.execute("ROLLBACK TO write_op")
+                self.conn.execute("RELEASE write_op")
+                outcomes.append((op, None, e))
+
+        self.conn.commit()
+        return outcomes
@@ -0,0 +1 @@
+from .SqliteWriter import SqliteWriter
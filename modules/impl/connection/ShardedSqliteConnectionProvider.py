@@ -0,0 +1,83 @@
+
+"""
+  Copyright (c) 2025 Alexandre Kavadias 
+
+  This project is licensed under the Educational and Non-Commercial Use License.
+  See the LICENSE file for details.
+"""
+import sqlite3
+import zlib
+from typing import Any, List, Tuple
+from modules.db.connection.IDbConnectionProvider import IDbConnectionProvider
+from modules.impl.connection.SqliteConnectionProvider import SqliteConnectionProvider
+
+class ShardedSqliteConnectionProvider(IDbConnectionProvider):
+    """
+    Spreads writes across several SQLite database files ("shards").
+    SQLite allows a single writer per database file, so writers routed to
+    different shards no longer wait on each other's lock.
+
+    Each shard is served by its own SqliteConnectionProvider. Rows are routed
+    with a shard key (e.g., a user ID). Foreign keys are not enforced on shard
+    connections because the referenced tables (e.g., users) live in another file;
+    as a consequence ON DELETE CASCADE does not reach rows stored in the shards.
+    """
+    # SQLite's default limit on attached databases (SQLITE_MAX_ATTACHED).
+    # get_connection() attaches every shard but the first, so it serves at most MAX_ATTACHED + 1 shards.
+    MAX_ATTACHED = 10
+
+    def __init__(self, database_paths: List[str], pool_size: int = 5):
+        """
+        Initialize the provider.
+            :param database_paths: Paths of the shard database files, one per shard.
+            :param pool_size: Maximum number of idle connections kept per shard. Default 5.
+        """
+        if not database_paths:
+            raise ValueError("ShardedSqliteConnectionProvider requires at least one database path.")
+        self.shards = [SqliteConnectionProvider(path, pool_size=pool_size, enforce_foreign_keys=False)
+                       for path in database_paths]
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.shards)
+
+    def shard_index(self, shard_key: Any) -> int:
+        """
+        Maps a shard key to a shard index.
+        Integer keys use a plain modulo; other keys use CRC32 so routing is stable
+        across processes (unlike hash() on strings).
+        """
+        if isinstance(shard_key, int):
+            return shard_key % len(self.shards)
+        return zlib.crc32(str(shard_key).encode("utf-8")) % len(self.shards)
+
+    def shard_for(self, shard_key: Any) -> SqliteConnectionProvider:
+        """
+        Returns the connection provider of the shard that owns 'shard_key'.
+        """
+        return self.shards[self.shard_index(shard_key)]
+
+    @property
+    def schemas(self) -> Tuple[str, ...]:
+        """Schema name of each shard on a get_connection() connection, by shard index."""
+        return ("main",) + tuple(f"shard_{i}" for i in range(1, len(self.shards)))
+
+    def supports_cross_shard_reads(self) -> bool:
+        """Tells whether every shard fits on one connection (see MAX_ATTACHED)."""
+        return len(self.shards) - 1 <= self.MAX_ATTACHED
+
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        Provides a connection for reads that span shards: it is opened on the first
+        shard ('main') and every other shard is attached under its name in 'schemas'.
+        A query then reads all shards at once, e.g. with a UNION ALL over
+        <schema>.<table> (see SqliteDaoChat.iter_all_chat_history_across_shards()).
+            :raises ValueError: If there are more shards than SQLite can attach (MAX_ATTACHED + 1).
+        """
+        if not self.supports_cross_shard_reads():
+            raise ValueError(f"{self.__class__.__name__}::Cannot attach {len(self.shards) - 1} shards, "
+                             f"SQLite attaches at most {self.MAX_ATTACHED} databases.")
+        conn = self.shards[0].get_connection()
+        for i, shard in enumerate(self.shards[1:], start=1):
+            conn.execute("ATTACH DATABASE ? AS ?", (shard.database_path, self.schemas[i]))
+        return conn
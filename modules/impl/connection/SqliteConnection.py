@@ -0,0 +1,44 @@
+
+"""
+  Copyright (c) 2025 Alexandre Kavadias
+
+  This project is licensed under the Educational and Non-Commercial Use License.
+  See the LICENSE file for details.
+"""
+import sqlite3
+import threading
+
+class SqliteConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection carrying the DAOs bound to it.
+    SqliteConnectionProvider opens its connections with this class (sqlite3.connect(factory=...)),
+    so a pooled connection keeps its DAOs across borrows instead of building new ones per call.
+    The DAOs are created on first access.
+
+    It also carries write_lock, shared by every DAO using the connection, so DAOs that share
+    one connection across threads run their transactions one at a time.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dao_verbose = False # Verbosity of the DAOs created by this connection
+        self.pragmas_applied = False # Set by SqliteConnectionProvider once the connection is tuned
+        self.write_lock = threading.RLock() # Reentrant: DAO calls made inside a transaction take it again
+        self._user_dao = None
+        self._chat_dao = None
+
+    @property
+    def user_dao(self):
+        """SqliteDaoUser bound to this connection."""
+        if self._user_dao is None:
+            # Imported locally: the DAO modules must not be loaded just to open a connection.
+            from modules.impl.dao.SqliteDaoUser import SqliteDaoUser
+            self._user_dao = SqliteDaoUser(connection=self, verbose=self.dao_verbose)
+        return self._user_dao
+
+    @property
+    def chat_dao(self):
+        """SqliteDaoChat bound to this connection."""
+        if self._chat_dao is None:
+            from modules.impl.dao.SqliteDaoChat import SqliteDaoChat
+            self._chat_dao = SqliteDaoChat(connection=self, verbose=self.dao_verbose)
+        return self._chat_dao
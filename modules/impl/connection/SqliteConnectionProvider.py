@@ -6,30 +6,191 @@
   See the LICENSE file for details.
 """
 import os
+import queue
 import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from modules.impl.connection.SqliteConnection import SqliteConnection
 from modules.db.connection.IDbConnectionProvider import IDbConnectionProvider # Import the new interface
 
 class SqliteConnectionProvider(IDbConnectionProvider): # Inherit from the interface
     """
     Concrete implementation of IDbConnectionProvider for SQLite databases.
-    Provides sqlite3.Connection objects.
+    Provides sqlite3.Connection objects, either fresh (get_connection) or
+    reused from a small pool of idle connections (pooled_connection).
+
+    Threading: connections are opened with check_same_thread=False, so a pooled
+    connection may be used by whichever thread borrows it. Only one thread uses a
+    connection at a time (the pool lends it exclusively), which is exactly what
+    SQLite's multi-thread mode (SQLITE_THREADSAFE=2, sqlite3.threadsafety == 1)
+    guarantees, without the per-call mutexes of serialized mode (SQLITE_THREADSAFE=1,
+    sqlite3.threadsafety == 3, the usual default). A library built with
+    SQLITE_THREADSAFE=2 is therefore the fastest fit; a single-thread build
+    (sqlite3.threadsafety == 0) is not safe with this provider.
     """
-    def __init__(self, database_path: str):
+    # Per-connection tuning applied to every connection handed out.
+    # journal_mode=WAL is persistent in the database file, so it is only set once per provider
+    # (see get_connection()). With WAL and synchronous=NORMAL a commit no longer waits for an
+    # fsync: after a power loss or OS crash the last committed transactions may be lost, but the
+    # database stays consistent, which is acceptable for chat history.
+    CONNECTION_PRAGMAS = (
+        "PRAGMA synchronous = NORMAL;",      # Safe with WAL, removes one fsync per commit
+        "PRAGMA wal_autocheckpoint = 1000;", # Checkpoint the WAL back into the database every ~1000 pages
+        "PRAGMA cache_size = -64000;",       # ~64 MB page cache
+        "PRAGMA temp_store = MEMORY;",
+        "PRAGMA mmap_size = 268435456;",     # 256 MB memory-mapped I/O
+        "PRAGMA busy_timeout = 5000;",       # Wait up to 5s inside SQLite on a locked database
+    )
+
+    # Size of sqlite3's per-connection prepared-statement cache (the driver default is 128).
+    CACHED_STATEMENTS = 256
+
+    def __init__(self, database_path: str, pool_size: int = 5, enforce_foreign_keys: bool = True, verbose: bool = False):
+        """
+        Initialize the provider.
+            :param database_path: Path to the SQLite database file.
+            :param pool_size: Maximum number of idle connections kept for reuse. Default 5.
+            :param enforce_foreign_keys: If True, run PRAGMA foreign_keys = ON on every connection. Default True.
+            :param verbose: Verbosity of the DAOs cached on each connection (conn.user_dao, conn.chat_dao). Default False.
+        """
         self.database_path = database_path
+        self.pool_size = pool_size
+        self.enforce_foreign_keys = enforce_foreign_keys
+        self.verbose = verbose
+        self._pool = queue.Queue(maxsize=pool_size)
+        self._read_pool = queue.Queue(maxsize=pool_size) # Read-only connections are pooled separately
+        self._begin_concurrent_supported = None # Detected lazily, see supports_begin_concurrent()
+        self._wal_enabled = False # journal_mode=WAL is set on the first read-write connection
         self._ensure_directories_exist()
+        if sqlite3.threadsafety == 0:
+            print(f"{self.__class__.__name__}::Warning -> SQLite was built single-threaded (SQLITE_THREADSAFE=0); "
+                  f"connections must not be shared between threads.")
+
+    @staticmethod
+    def remove_database_files(database_path: str):
+        """
+        Deletes a database file together with its WAL side files (-wal, -shm), if they exist.
+        A stale -wal file left next to a new database would otherwise be replayed into it.
+        """
+        for path in (database_path, f"{database_path}-wal", f"{database_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
 
     def _ensure_directories_exist(self):
         dir_path = os.path.dirname(self.database_path)
         if dir_path and not os.path.exists(dir_path):
             os.makedirs(dir_path, exist_ok=True)
 
-    def get_connection(self) -> sqlite3.Connection: # Type hint specific connection for implementation
+    def get_connection(self, read_only: bool = False) -> SqliteConnection: # Type hint specific connection for implementation
         """
         Provides a new, configured SQLite connection.
+        The connection is in autocommit mode (isolation_level=None): the driver never opens
+        transactions implicitly, they are started with an explicit BEGIN (e.g., SqliteDao.transaction()).
+        It is a SqliteConnection, so its DAOs are available as conn.user_dao and conn.chat_dao.
+            :param read_only: If True, open the database with the URI flag mode=ro. SQLite then
+                              never takes write locks on it, and reads go through the mmap set
+                              up by PRAGMA mmap_size. Default False.
         """
-        conn = sqlite3.connect(self.database_path, check_same_thread=False)
+        if read_only:
+            database_uri = f"{Path(self.database_path).resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(database_uri, uri=True, check_same_thread=False, isolation_level=None,
+                                   cached_statements=self.CACHED_STATEMENTS, factory=SqliteConnection)
+        else:
+            conn = sqlite3.connect(self.database_path, check_same_thread=False, isolation_level=None,
+                                   cached_statements=self.CACHED_STATEMENTS, factory=SqliteConnection)
+        conn.dao_verbose = self.verbose
         conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
+        if not read_only and not self._wal_enabled:
+            # Persistent in the database file: once is enough for every later connection
+            conn.execute("PRAGMA journal_mode = WAL;")
+            self._wal_enabled = True
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if self.enforce_foreign_keys else 'OFF'};")
+        for pragma in self.CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.pragmas_applied = True # DAOs skip their own tuning (SqliteDao._apply_pragmas)
         return conn
 
-    # No explicit close_connection here, as connections are returned and managed by caller.
\ No newline at end of file
+    def get_read_connection(self) -> sqlite3.Connection:
+        """
+        Provides a new read-only (mode=ro) connection. With WAL, readers never block
+        the writer and are never blocked by it. The database file must already exist.
+        """
+        return self.get_connection(read_only=True)
+
+    def get_write_connection(self) -> sqlite3.Connection:
+        """Provides a new read-write connection."""
+        return self.get_connection(read_only=False)
+
+    def acquire(self, read_only: bool = False) -> sqlite3.Connection:
+        """
+        Takes an idle connection from the pool, or opens a new one if none is available.
+        The connection must be handed back with release(), using the same read_only flag.
+        """
+        try:
+            return (self._read_pool if read_only else self._pool).get_nowait()
+        except queue.Empty:
+            return self.get_connection(read_only=read_only)
+
+    def release(self, conn: sqlite3.Connection, read_only: bool = False):
+        """
+        Returns a connection to the pool. Any transaction left open is rolled back.
+        If the pool is already full, the connection is closed instead.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            (self._read_pool if read_only else self._pool).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def pooled_connection(self, read_only: bool = False):
+        """
+        Context manager lending a pooled connection for the duration of the block.
+        Like a plain sqlite3 connection used in a 'with', it commits on success
+        and rolls back on error; the connection then goes back to the pool.
+            :param read_only: If True, lend a read-only (mode=ro) connection. Default False.
+        """
+        conn = self.acquire(read_only=read_only)
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn, read_only=read_only)
+
+    def supports_begin_concurrent(self) -> bool:
+        """
+        Tells whether the linked SQLite library accepts BEGIN CONCURRENT.
+
+        Stock SQLite (including the one bundled with Python) does not: it serializes all
+        writers on the database write lock, even in WAL mode. BEGIN CONCURRENT comes from
+        SQLite's 'begin-concurrent' branch (e.g. 'begin-concurrent-pnu-wal2'), which defers
+        locking to COMMIT and detects conflicts per page, so transactions touching different
+        pages commit in parallel. Using it requires building that SQLite version and making
+        Python's sqlite3 module link against it. A commit that conflicts fails with
+        SQLITE_BUSY_SNAPSHOT and the whole transaction must be retried.
+
+        The result is detected once by trying the statement, then cached.
+        """
+        if self._begin_concurrent_supported is None:
+            conn = self.acquire()
+            try:
+                conn.execute("BEGIN CONCURRENT")
+                conn.rollback()
+                self._begin_concurrent_supported = True
+            except sqlite3.OperationalError:
+                self._begin_concurrent_supported = False
+            finally:
+                self.release(conn)
+        return self._begin_concurrent_supported
+
+    def close_all(self):
+        """Closes every idle connection currently held by the pools."""
+        for pool in (self._pool, self._read_pool):
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    # Connections from get_connection() are owned by the caller; pooled ones are returned with release().
\ No newline at end of file
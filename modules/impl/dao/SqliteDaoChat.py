@@ -4,6 +4,8 @@
   This project is licensed under the Educational and Non-Commercial Use License.
   See the LICENSE file for details.
 """
+import functools
+import itertools
 import sqlite3
 from modules.db.dao.SqliteDao import SqliteDao
 
@@ -21,6 +23,57 @@ class SqliteDaoChat(SqliteDao):
     _field_role = "role"
     _field_text = "text"
 
+    # SQL is built once at class definition so every call sends the same string
+    # and hits sqlite3's per-connection prepared-statement cache.
+    _SQL_INSERT = f"""INSERT INTO {tablename}
+                      ({_field_user_id}, {_field_session_id}, {_field_role}, {_field_text})
+                      VALUES (?, ?, ?, ?)"""
+    _SQL_INSERT_MULTI_PREFIX = f"""INSERT INTO {tablename}
+                      ({_field_user_id}, {_field_session_id}, {_field_role}, {_field_text})
+                      VALUES """
+    # Largest row count insert_chat_history_multi() accepts: 4 parameters per row must stay
+    # within SQLite's bound-parameter limit, which is 999 on builds older than 3.32.
+    MULTI_INSERT_MAX_ROWS = 999 // 4
+    _SQL_CREATE_INDEX_USER_SESSION = f"""CREATE INDEX IF NOT EXISTS idx_chat_user_session
+                                         ON {tablename} ({_field_user_id}, {_field_session_id})"""
+    # Without RETURNING support the plain INSERT is used and the ID comes from cursor.lastrowid
+    _SQL_INSERT_RETURNING_ID = f"""{_SQL_INSERT}
+                      RETURNING {_field_id}""" if SqliteDao.RETURNING_SUPPORTED else _SQL_INSERT
+    _SQL_SELECT_BY_USER = f"""SELECT {_field_role}, {_field_text}
+                              FROM {tablename}
+                              WHERE {_field_user_id} = ?"""
+    _SQL_SELECT_BY_USER_AND_SESSION = f"""SELECT {_field_role}, {_field_text}
+                                          FROM {tablename}
+                                          WHERE {_field_user_id} = ? AND {_field_session_id} = ?
+                                          ORDER BY {_field_id}"""
+    _SQL_SELECT_COLUMNS_BY_USER_AND_SESSION = f"""SELECT {_field_id}, {_field_session_id}, {_field_user_id}, {_field_role}, {_field_text}
+                                          FROM {tablename}
+                                          WHERE {_field_user_id} = ? AND {_field_session_id} = ?
+                                          ORDER BY {_field_id}"""
+    # Every message of a user, grouped by session: the order is the order of idx_chat_user_session
+    # (user_id, session_id, id), so no sort step is needed and one pass yields both the history
+    # and the session list.
+    _SQL_SELECT_ALL_WITH_ID_BY_USER = f"""SELECT {_field_id}, {_field_session_id}, {_field_role}, {_field_text}
+                                          FROM {tablename}
+                                          WHERE {_field_user_id} = ?
+                                          ORDER BY {_field_session_id}, {_field_id}"""
+    _SQL_COUNT_BY_USER_AND_SESSION = f"""SELECT COUNT(*)
+                                         FROM {tablename}
+                                         WHERE {_field_user_id} = ? AND {_field_session_id} = ?"""
+    _SQL_DELETE_BY_USER_AND_SESSION = f"""DELETE FROM {tablename}
+                                          WHERE {_field_user_id} = ? AND {_field_session_id} = ?"""
+    _SQL_SELECT_ALL_BY_USER = f"""SELECT {_field_session_id}, {_field_role}, {_field_text}
+                                  FROM {tablename}
+                                  WHERE {_field_user_id} = ?
+                                  ORDER BY {_field_session_id}, {_field_id}"""
+    # GROUP BY on the index order walks idx_chat_user_session once (covering, no temp B-tree)
+    # and returns the sessions sorted.
+    _SQL_SELECT_DISTINCT_SESSIONS = f"""SELECT {_field_session_id}
+                                        FROM {tablename}
+                                        WHERE {_field_user_id} = ?
+                                        GROUP BY {_field_session_id}
+                                        ORDER BY {_field_session_id}"""
+
     
     def __init__(self, connection: sqlite3.Connection,verbose :bool=False):
         """
@@ -39,8 +92,9 @@ class SqliteDaoChat(SqliteDao):
 
     def create_table_chat_history(self):
         """
-        Create the chat history table if it does not exist.
+        Create the chat history table and its index if they do not exist.
         This method is called to initialize the database schema for chat history.
+        Both statements are idempotent (IF NOT EXISTS), so no existence check is needed first.
         """
         self._ensure_connected()
         with self.conn:
@@ -56,26 +110,70 @@ class SqliteDaoChat(SqliteDao):
                     FOREIGN KEY({self._field_user_id}) REFERENCES {SqliteDaoUser.tablename}({SqliteDaoUser._field_id}) ON DELETE CASCADE
                 )
             """)
+            # Covers every per-user lookup (WHERE user_id = ? [AND session_id = ?]) and lets
+            # SELECT DISTINCT session_id be answered from the index alone.
+            # Index entries end with the rowid (id), so the index is effectively (user_id, session_id, id)
+            # and ORDER BY session_id, id / ORDER BY id within a session need no sort step.
+            # A separate index on user_id alone would be redundant: it is this index's left prefix.
+            self.conn.execute(self._SQL_CREATE_INDEX_USER_SESSION)
 
-    def insert_chat_history(self, user_id, session_id, role, text, max_retries=5, retry_delay=0.1):
+    def insert_chat_history(self, user_id, session_id, role, text):
         """
         Insert a chat message into the chat history.
             :param user_id: ID of the user sending the message.
             :param session_id: ID of the chat session.
             :param role: Role of the user (e.g., "user", "...").
             :param text: Text of the chat message.
-            :param max_retries: Maximum number of retries for database lock. Default 5.
-            :param retry_delay: Delay between retries in seconds. Default 0.1 seconds.
-            :return: True if insertion was successful, False otherwise.
+            :return: ID of the new message (returned by the INSERT itself), or None if the insertion failed.
         """
-        return self._execute_with_retry( 
-                                query=f"""INSERT INTO {self.tablename}
-                                ({self._field_user_id}, {self._field_session_id}, {self._field_role}, {self._field_text})
-                                VALUES (?, ?, ?, ?)""", 
+        row = self._execute_with_retry( 
+                                query=self._SQL_INSERT_RETURNING_ID, 
                                 params=(user_id, session_id, role, text), 
-                                max_retries=5, 
-                                retry_delay=0.1)
+                                fetch_one=True)
+        return row[0] if row else None
+
+    def insert_chat_history_many(self, rows):
+        """
+        Insert several chat messages with a single executemany() in one transaction.
+            :param rows: List of (user_id, session_id, role, text) tuples.
+            :return: True if all rows were inserted, False otherwise.
+        """
+        return self._execute_many_with_retry(
+                                query=self._SQL_INSERT,
+                                seq_params=rows)
+
+    def insert_chat_history_multi(self, rows):
+        """
+        Insert several chat messages with a single multi-row INSERT ... VALUES (...), (...), ...
+        One statement and one transaction for all rows; suited to small fixed-shape batches.
+            :param rows: List of (user_id, session_id, role, text) tuples, at most MULTI_INSERT_MAX_ROWS.
+            :return: True if all rows were inserted, False otherwise.
+        """
+        if not rows:
+            return True
+        if len(rows) > self.MULTI_INSERT_MAX_ROWS:
+            raise ValueError(f"{self.__class__.__name__}::insert_chat_history_multi accepts at most {self.MULTI_INSERT_MAX_ROWS} rows, got {len(rows)}.")
+        return self._execute_with_retry(
+                                query=self._sql_insert_multi(len(rows)),
+                                params=list(itertools.chain.from_iterable(rows)))
 
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _sql_insert_multi(cls, num_rows):
+        """Multi-row INSERT for 'num_rows' rows, built once per row count (at most MULTI_INSERT_MAX_ROWS)."""
+        return cls._SQL_INSERT_MULTI_PREFIX + ", ".join(["(?, ?, ?, ?)"] * num_rows)
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _sql_select_all_across_shards(cls, schemas):
+        """
+        UNION ALL of the chat table of every shard schema, built once per schema tuple.
+        IDs are rewritten into composite IDs (local_id * N + shard_index), as ShardingChatRepository exposes them.
+        """
+        columns = f"{cls._field_session_id}, {cls._field_user_id}, {cls._field_role}, {cls._field_text}"
+        return " UNION ALL ".join(
+            f"SELECT {cls._field_id} * {len(schemas)} + {shard_index} AS {cls._field_id}, {columns} FROM {schema}.{cls.tablename}"
+            for shard_index, schema in enumerate(schemas))
 
     def get_chat_history_by_user_id(self, user_id):
         """
@@ -83,12 +181,7 @@ class SqliteDaoChat(SqliteDao):
             :param user_id: ID of the user.
             :return: List of chat messages for the user.
         """
-        return self.execute_query(query= 
-                                 f"""
-                                SELECT {self._field_role}, {self._field_text}
-                                FROM {self.tablename}
-                                WHERE {self._field_user_id} = ?
-                                """, 
+        return self.execute_query(query=self._SQL_SELECT_BY_USER, 
                                 params=(user_id,), 
                                 fetch_one=False, 
                                 fetch_all=True)
@@ -99,40 +192,128 @@ class SqliteDaoChat(SqliteDao):
         Retrieve chat history for a specific user ID and session ID.
             :param user_id: ID of the user.
             :param session_id: ID of the chat session.
-            :return: List of chat messages for the user in the session.
-        """
-        return self.execute_query(query= 
-                                f"""
-                                SELECT {self._field_role}, {self._field_text}
-                                FROM {self.tablename}
-                                WHERE {self._field_user_id} = ? AND {self._field_session_id} = ?
-                                """, 
+            :return: List of chat messages for the user in the session, in insertion order.
+        """
+        return self.execute_query(query=self._SQL_SELECT_BY_USER_AND_SESSION, 
                                 params=(user_id, session_id), 
                                 fetch_one=False, 
                                 fetch_all=True)
 
-        
-        
+    def get_chat_history_columns_for_user_and_session(self, user_id, session_id):
+        """
+        Retrieve chat history for a specific user ID and session ID, column by column.
+            :param user_id: ID of the user.
+            :param session_id: ID of the chat session.
+            :return: {column name: list of values} for id, session_id, user_id, role and text,
+                     in insertion order.
+        """
+        return self.execute_query_as_columns(query=self._SQL_SELECT_COLUMNS_BY_USER_AND_SESSION,
+                                             params=(user_id, session_id))
+
+    def get_chat_history_dicts_for_user_and_session(self, user_id, session_id):
+        """
+        Retrieve chat history for a specific user ID and session ID as dictionaries.
+            :param user_id: ID of the user.
+            :param session_id: ID of the chat session.
+            :return: List of {column name: value} dictionaries, in insertion order.
+        """
+        return self.execute_query_as_dicts(query=self._SQL_SELECT_BY_USER_AND_SESSION,
+                                           params=(user_id, session_id))
+
+
+    def count_chat_history_for_user_and_session(self, user_id, session_id):
+        """
+        Count the chat messages of a specific user ID and session ID.
+            :param user_id: ID of the user.
+            :param session_id: ID of the chat session.
+            :return: Number of messages in the session.
+        """
+        return self.execute_query(query=self._SQL_COUNT_BY_USER_AND_SESSION,
+                                  params=(user_id, session_id),
+                                  fetch_one=True,
+                                  scalar=True)
 
-    def delete_chat_history(self, user_id, session_id, max_retries=5, retry_delay=0.1):
+    def delete_chat_history(self, user_id, session_id):
         """
         Delete chat history for a specific user ID and session ID.
             :param user_id: ID of the user.
             :param session_id: ID of the chat session.
-            :param max_retries: Maximum number of retries for database lock. Default 5.
-            :param retry_delay: Delay between retries in seconds. Default 0.1 seconds.
             :return: True if deletion was successful, False otherwise.
         """
 
         return self._execute_with_retry( 
-                                query=
-                                f"""
-                                DELETE FROM {self.tablename}
-                                WHERE {self._field_user_id} = ? AND {self._field_session_id} = ?
-                                """, 
-                                params=(user_id, session_id), 
-                                max_retries=5, 
-                                retry_delay=0.1)
+                                query=self._SQL_DELETE_BY_USER_AND_SESSION, 
+                                params=(user_id, session_id))
+
+    def delete_chat_history_count(self, user_id, session_id):
+        """
+        Delete chat history for a specific user ID and session ID and tell how many messages went.
+        The count comes from the DELETE itself (cursor.rowcount): no follow-up query.
+            :param user_id: ID of the user.
+            :param session_id: ID of the chat session.
+            :return: Number of deleted messages (0 if the session had none), or None if the deletion failed.
+        """
+        return self._execute_with_retry(query=self._SQL_DELETE_BY_USER_AND_SESSION,
+                                        params=(user_id, session_id),
+                                        rowcount=True)
+
+    def iter_chat_history_for_user_and_session(self, user_id, session_id, batch_size=1000):
+        """
+        Stream chat history for a specific user ID and session ID, batch_size rows at a time.
+            :param user_id: ID of the user.
+            :param session_id: ID of the chat session.
+            :param batch_size: Number of rows fetched from SQLite per batch. Default 1000.
+            :return: Generator of (role, text) rows, in insertion order.
+        """
+        return self.iter_query(query=self._SQL_SELECT_BY_USER_AND_SESSION,
+                               params=(user_id, session_id),
+                               batch_size=batch_size)
+
+    def iter_all_chat_history_by_user(self, user_id, batch_size=1000):
+        """
+        Stream all chat history for a specific user ID, batch_size rows at a time.
+            :param user_id: ID of the user.
+            :param batch_size: Number of rows fetched from SQLite per batch. Default 1000.
+            :return: Generator of chat message rows for the user.
+        """
+        return self.iter_query(query=self._SQL_SELECT_ALL_BY_USER,
+                               params=(user_id,),
+                               batch_size=batch_size)
+
+    def iter_all_chat_history_across_shards(self, schemas, batch_size=1000):
+        """
+        Stream every chat message of every shard with one query, batch_size rows at a time.
+        The connection must have the shards attached (ShardedSqliteConnectionProvider.get_connection()).
+            :param schemas: Schema name of each shard, by shard index (ShardedSqliteConnectionProvider.schemas).
+            :param batch_size: Number of rows fetched from SQLite per batch. Default 1000.
+            :return: Generator of (id, session_id, user_id, role, text) tuples with composite IDs, shard by shard.
+        """
+        return self.iter_query(query=self._sql_select_all_across_shards(tuple(schemas)),
+                               batch_size=batch_size,
+                               tuples=True)
+
+    def iter_distinct_sessions_for_user(self, user_id, batch_size=1000):
+        """
+        Stream the distinct chat sessions for a specific user ID, batch_size rows at a time.
+            :param user_id: ID of the user.
+            :param batch_size: Number of rows fetched from SQLite per batch. Default 1000.
+            :return: Generator of the user's session IDs (plain strings), sorted.
+        """
+        return self.iter_query(query=self._SQL_SELECT_DISTINCT_SESSIONS,
+                               params=(user_id,),
+                               batch_size=batch_size,
+                               scalar=True)
+
+    def get_all_chat_history_with_id_by_user(self, user_id):
+        """
+        Retrieve all chat history for a specific user ID, with the message IDs.
+            :param user_id: ID of the user.
+            :return: List of (id, session_id, role, text) tuples, ordered by session then insertion.
+        """
+        return self.execute_query(query=self._SQL_SELECT_ALL_WITH_ID_BY_USER,
+                                  params=(user_id,),
+                                  fetch_all=True,
+                                  tuples=True)
 
     def get_all_chat_history_by_user(self, user_id):
         """
@@ -140,13 +321,7 @@ class SqliteDaoChat(SqliteDao):
             :param user_id: ID of the user.
             :return: List of all chat messages for the user.
         """
-        return self.execute_query(query= 
-                                f"""
-                                SELECT {self._field_session_id}, {self._field_role}, {self._field_text}
-                                FROM {self.tablename}
-                                WHERE {self._field_user_id} = ?
-                                ORDER BY {self._field_session_id}, {self._field_id}
-                                """, 
+        return self.execute_query(query=self._SQL_SELECT_ALL_BY_USER, 
                                 params=(user_id,), 
                                 fetch_one=False, 
                                 fetch_all=True)
@@ -155,15 +330,11 @@ class SqliteDaoChat(SqliteDao):
         """
         Retrieve distinct chat sessions for a specific user ID.
             :param user_id: ID of the user.
-            :return: List of distinct session IDs for the user.
-        """
-        return self.execute_query(query= 
-                               f"""
-                                SELECT DISTINCT {self._field_session_id}
-                                FROM {self.tablename}
-                                WHERE {self._field_user_id} = ?
-                                """,    
+            :return: List of distinct session IDs (plain strings) for the user, sorted.
+        """
+        return self.execute_query(query=self._SQL_SELECT_DISTINCT_SESSIONS, 
                                 params=(user_id,), 
                                 fetch_one=False, 
-                                fetch_all=True)
+                                fetch_all=True,
+                                scalar=True) # One column: skip the sqlite3.Row wrapper
        
@@ -21,6 +21,33 @@ class SqliteDaoUser(SqliteDao):
     _field_email = "email"
     _field_created_at = "created_at"
 
+    # SQL is built once at class definition so every call sends the same string
+    # and hits sqlite3's per-connection prepared-statement cache.
+    _SQL_CREATE_TABLE = f"""CREATE TABLE IF NOT EXISTS {tablename} (
+                                {_field_id} INTEGER PRIMARY KEY AUTOINCREMENT,
+                                {_field_username} TEXT UNIQUE NOT NULL,
+                                {_field_password_hash} TEXT,
+                                {_field_email} TEXT UNIQUE NOT NULL,
+                                {_field_created_at} DEFAULT CURRENT_TIMESTAMP
+                            )"""
+    _SQL_INSERT = f"""INSERT INTO {tablename}
+                      ({_field_username}, {_field_password_hash}, {_field_email})
+                      VALUES (?, ?, ?)
+                      ON CONFLICT DO NOTHING"""
+    # A username or email that already exists skips the row instead of raising IntegrityError,
+    # so a conflict (no ID returned) is told apart from a locked database (an error).
+    # The table is AUTOINCREMENT, so each skipped row still consumes an ID: user IDs may have gaps.
+    # Without RETURNING support the plain INSERT is used and the ID comes from cursor.lastrowid
+    _SQL_INSERT_RETURNING_ID = f"""{_SQL_INSERT}
+                      RETURNING {_field_id}""" if SqliteDao.RETURNING_SUPPORTED else _SQL_INSERT
+    _SQL_SELECT_ID_BY_USERNAME = f"""SELECT {_field_id}
+                                     FROM {tablename}
+                                     WHERE {_field_username} = ?"""
+    _SQL_SELECT_ALL = f"""SELECT *
+                          FROM {tablename}"""
+    _SQL_DELETE = f"""DELETE FROM {tablename}
+                      WHERE {_field_id} = ?"""
+
     
     def __init__(self, connection: sqlite3.Connection,verbose :bool=False):
         """
@@ -45,35 +72,56 @@ class SqliteDaoUser(SqliteDao):
         """
         self._ensure_connected()
         with self.conn:
-            self.conn.execute(f"""
-                CREATE TABLE IF NOT EXISTS {self.tablename} (
-                    {self._field_id} INTEGER PRIMARY KEY AUTOINCREMENT,
-                    {self._field_username} TEXT UNIQUE NOT NULL,
-                    {self._field_password_hash} TEXT,
-                    {self._field_email} TEXT UNIQUE NOT NULL,
-                    {self._field_created_at} DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-    def insert_user(self, username, password_hash, email, max_retries=5, retry_delay=0.1):
+            self.conn.execute(self._SQL_CREATE_TABLE)
+
+    def insert_user(self, username, password_hash, email):
         """
         Insert a new user into the users table.
             :param username: Username of the new user.
             :param password_hash: Password hash of the new user.
             :param email: Email of the new user.
-            :param max_retries: Maximum number of retries in case of a locked database. Default 5.
-            :param retry_delay: Delay between retries in seconds. Default 0.1 seconds.
-            :return: True if the user was successfully inserted, False otherwise.
-        """
-        return self._execute_with_retry( 
-                                query=f"""
-                                    INSERT INTO {self.tablename}
-                                    ({self._field_username}, {self._field_password_hash}, {self._field_email})
-                                    VALUES (?, ?, ?)
-                                    """, 
+            :return: ID of the new user (returned by the INSERT itself), or None if the insertion failed
+                     or the username or email already exists. A skipped duplicate still consumes an
+                     AUTOINCREMENT ID, so the next user's ID may leave a gap.
+        """
+        row = self._execute_with_retry( 
+                                query=self._SQL_INSERT_RETURNING_ID, 
                                 params=(username, password_hash, email,), 
-                                max_retries=5, 
-                                retry_delay=0.1)
+                                fetch_one=True)
+        return row[0] if row else None
+
+    def insert_users(self, rows):
+        """
+        Insert several users in one transaction.
+        executemany() discards the rows produced by RETURNING, so each user is its own INSERT,
+        all sharing one transaction and the cached prepared statement.
+            :param rows: List of (username, password_hash, email) tuples.
+            :return: List with, for each row, the new user's ID or None if the username or email
+                     already exists (skipped rows still consume an ID, see insert_user()); None if
+                     the database stayed locked.
+        """
+        self._ensure_connected()
+        if self.verbose:
+            print(f"{self.__class__.__name__}::Inserting {len(rows)} users")
+
+        if self.writer is not None and not self.conn.in_transaction:
+            # Submitted together, the inserts are written by the writer thread in one batch
+            futures = [self.writer.submit(self._SQL_INSERT_RETURNING_ID, row, fetch_one=True) for row in rows]
+            return [(row[0] if row else None) for row in (future.result() for future in futures)]
+
+        try:
+            with self.transaction():
+                ids = []
+                for row in rows:
+                    inserted = self._fetch_one_or_lastrowid(self.conn.execute(self._SQL_INSERT_RETURNING_ID, row))
+                    ids.append(inserted[0] if inserted else None)
+        except sqlite3.OperationalError as e:
+            if "database is locked" not in str(e):
+                raise
+            if self.verbose:
+                print(f"{self.__class__.__name__}::Database still locked after busy_timeout: {e}")
+            return None
+        return ids
         
 
     def get_user_id_by_username(self, username):
@@ -83,12 +131,7 @@ class SqliteDaoUser(SqliteDao):
             :return: User ID if found, None otherwise.
         """
 
-        return self.execute_query(query= 
-                                 f"""
-                                SELECT {self._field_id}
-                                FROM {self.tablename}
-                                WHERE {self._field_username} = ?
-                                """, 
+        return self.execute_query(query=self._SQL_SELECT_ID_BY_USERNAME, 
                                 params=(username,), 
                                 fetch_one=True, 
                                 fetch_all=False)
@@ -99,30 +142,18 @@ class SqliteDaoUser(SqliteDao):
             :return: all users in the users table.
         """
 
-        return self.execute_query(query= 
-                                 f"""
-                                SELECT * 
-                                FROM {self.tablename}
-                                """, 
+        return self.execute_query(query=self._SQL_SELECT_ALL, 
                                 params=None, 
                                 fetch_one=False, 
                                 fetch_all=True)
        
 
-    def delete_user(self, user_id ,max_retries=5, retry_delay=0.1):
+    def delete_user(self, user_id):
         """
         Delete a user from the users table.
             :param user_id: ID of the user to be deleted.
-            :param max_retries: Maximum number of retries in case of a locked database. Default 5.
-            :param retry_delay: Delay between retries in seconds. Default 0.1 seconds.
             :return: True if the user was successfully deleted, False otherwise.
         """
 
-        return self._execute_with_retry(query=
-                                        f"""
-                                        DELETE FROM {self.tablename}
-                                        WHERE {self._field_id} = ?
-                                        """, 
-                                        params=(user_id,), 
-                                        max_retries=5, 
-                                        retry_delay=0.1)
+        return self._execute_with_retry(query=self._SQL_DELETE, 
+                                        params=(user_id,))
@@ -4,6 +4,8 @@
   This project is licensed under the Educational and Non-Commercial Use License.
   See the LICENSE file for details.
 """
+import threading
+from contextlib import contextmanager
 from modules.db.factories.IDbFactory import IDbFactory
 from modules.impl.connection.SqliteConnectionProvider import SqliteConnectionProvider
 from modules.impl.dao.SqliteDaoChat import SqliteDaoChat
@@ -11,12 +13,25 @@ from modules.impl.dao.SqliteDaoUser import SqliteDaoUser
 
 
 class SqliteDbFactory(IDbFactory):
-    def __init__(self, database_path:str,verbose:bool=False):
+    # add_chat_messages_bulk() uses executemany() below this many rows, multi-row VALUES from there on
+    BULK_MULTI_INSERT_MIN_ROWS = 100
+
+    def __init__(self, database_path:str,verbose:bool=False, pool_size:int=5):
+        """
+        Initialize the factory.
+            :param database_path: Path to the SQLite database file.
+            :param verbose: If True, print debug information. Default is False.
+            :param pool_size: Number of idle connections kept open between calls (per pool:
+                              read-write and read-only). Default 5.
+        """
         self.database_path = database_path
         self.verbose = verbose
         # Initialize the connection provider with the database path
-        # This will create the directory if it does not exist  
-        self._connection_provider = SqliteConnectionProvider(database_path)
+        # This will create the directory if it does not exist.
+        # Operations borrow its pooled connections, which stay open (and keep their page cache,
+        # tuning and DAOs) between calls instead of being opened and closed each time.
+        self._connection_provider = SqliteConnectionProvider(database_path, pool_size=pool_size, verbose=verbose)
+        self._local = threading.local() # Connection of the transaction() open in the calling thread, if any
         # Always ensure tables exist, safe due to "IF NOT EXISTS"
         self.initialize_database_tables()
 
@@ -30,26 +45,76 @@ class SqliteDbFactory(IDbFactory):
         """
         return self._connection_provider.get_connection()
 
+    def get_read_connection(self):
+        """
+        Provides a new read-only SQLite connection for queries that never write.
+        Keeps readers off the read-write connections used by writers.
+        """
+        return self._connection_provider.get_read_connection()
+
+    @contextmanager
+    def transaction(self, mode: str = "IMMEDIATE"):
+        """
+        Group several factory operations in one transaction (a single commit):
+
+            with factory.transaction():
+                factory.add_chat_message(...)
+                factory.add_chat_message(...)
+
+        Inside the block, every operation of this factory called from the same thread runs
+        on the transaction's connection, reads included (they see the uncommitted writes).
+        Commits when the block ends, rolls everything back if it raises.
+        Nested calls join the outer transaction.
+            :param mode: SQLite BEGIN mode ("DEFERRED", "IMMEDIATE" or "EXCLUSIVE"). Default "IMMEDIATE",
+                         which takes the write lock up front instead of failing on the first write.
+            :return: The connection the transaction runs on.
+        """
+        conn = getattr(self._local, "transaction_conn", None)
+        if conn is not None:
+            yield conn
+            return
+        with self._connection_provider.pooled_connection() as conn:
+            with conn.user_dao.transaction(mode):
+                self._local.transaction_conn = conn
+                try:
+                    yield conn
+                finally:
+                    self._local.transaction_conn = None
+
+    @contextmanager
+    def _connection(self, read_only: bool = False):
+        """
+        Connection for one operation: the calling thread's open transaction() if any,
+        otherwise a connection borrowed from the pool (read-only pool when read_only).
+        """
+        conn = getattr(self._local, "transaction_conn", None)
+        if conn is not None:
+            yield conn # Commit and rollback are left to transaction()
+            return
+        with self._connection_provider.pooled_connection(read_only=read_only) as conn:
+            yield conn
+
+    def close(self):
+        """Closes the idle pooled connections. Connections are opened again on demand."""
+        self._connection_provider.close_all()
+
     def initialize_database_tables(self):
         """
         Ensures all required tables exist in the database.
         This method can be safely called multiple times.
         """
-        with self.get_connection() as conn: # Get a connection to initialize
-            user_dao = SqliteDaoUser(connection=conn,verbose=self.verbose)
-            user_dao.create_table_users()
-            chat_dao = SqliteDaoChat(connection=conn,verbose=self.verbose)
-            chat_dao.create_table_chat_history()
+        with self._connection_provider.pooled_connection() as conn: # Get a connection to initialize
+            conn.user_dao.create_table_users()
+            conn.chat_dao.create_table_chat_history()
         print("Database tables ensured to exist.")
 
     def create_user(self, username, password_hash, email):
         """
         Create a new user in the database.
-        A new connection is opened and closed for this single operation.
+        A pooled connection is borrowed for this single operation.
         """
-        with self.get_connection() as conn:
-            user_dao = SqliteDaoUser(connection=conn,verbose=self.verbose)
-            return user_dao.insert_user(username, password_hash, email)
+        with self._connection() as conn:
+            return conn.user_dao.insert_user(username, password_hash, email)
 
     def get_user_id(self, username):
         """
@@ -57,8 +122,8 @@ class SqliteDbFactory(IDbFactory):
         :param username: Username of the user.
         :return: User ID if found, None otherwise.
         """
-        with self.get_connection() as conn:
-            user_dao = SqliteDaoUser(connection=conn,verbose=self.verbose)
+        with self._connection(read_only=True) as conn:
+            user_dao = conn.user_dao
             # DaoUser.get_user_id_by_username returns a sqlite3.Row object or None
             user_row = user_dao.get_user_id_by_username(username)
             if user_row:
@@ -71,18 +136,43 @@ class SqliteDbFactory(IDbFactory):
         :param user_id: ID of the user to be deleted.
         :return: True if the user was successfully deleted, False otherwise.
         """
-        with self.get_connection() as conn:
-            user_dao = SqliteDaoUser(connection=conn,verbose=self.verbose)
+        with self._connection() as conn:
+            user_dao = conn.user_dao
             return user_dao.delete_user(user_id)
 
     def add_chat_message(self, user_id, session_id, role, text):
         """
         Add a chat message to the chat history.
-        A new connection is opened and closed for this single operation.
+        A pooled connection is borrowed for this single operation.
+        """
+        with self._connection() as conn:
+            return conn.chat_dao.insert_chat_history(user_id, session_id, role, text)
+
+    def add_chat_messages_bulk(self, rows):
+        """
+        Add several chat messages in one transaction (a single commit).
+        A small batch (fewer than BULK_MULTI_INSERT_MIN_ROWS rows) runs the single-row INSERT
+        through executemany(). Larger ones are sent as multi-row INSERT ... VALUES (...), (...), ...
+        statements of up to SqliteDaoChat.MULTI_INSERT_MAX_ROWS rows each, so they cost a handful
+        of statements instead of one per message.
+        :param rows: List of (user_id, session_id, role, text) tuples.
+        :return: True if all messages were added, False otherwise.
         """
-        with self.get_connection() as conn:
-            chat_dao = SqliteDaoChat(connection=conn,verbose=self.verbose)
-            return chat_dao.insert_chat_history(user_id, session_id, role, text)
+        chunk_size = SqliteDaoChat.MULTI_INSERT_MAX_ROWS
+        try:
+            with self.transaction() as conn:
+                chat_dao = conn.chat_dao
+                if len(rows) < self.BULK_MULTI_INSERT_MIN_ROWS:
+                    if not chat_dao.insert_chat_history_many(rows):
+                        raise Exception(f"Failed to add {len(rows)} chat messages.")
+                    return True
+                for start in range(0, len(rows), chunk_size):
+                    if not chat_dao.insert_chat_history_multi(rows[start:start + chunk_size]):
+                        raise Exception(f"Failed to add chat messages {start} to {start + chunk_size - 1}.")
+            return True
+        except Exception as e:
+            print(f"Transaction failed for bulk chat message insert: {e}")
+            return False
 
     def get_chat_history(self, user_id, session_id):
         """
@@ -91,8 +181,8 @@ class SqliteDbFactory(IDbFactory):
         :param session_id: ID of the chat session.
         :return: List of chat messages for the user in the session.
         """
-        with self.get_connection() as conn:
-            chat_dao = SqliteDaoChat(connection=conn,verbose=self.verbose)
+        with self._connection(read_only=True) as conn:
+            chat_dao = conn.chat_dao
             return chat_dao.get_chat_history_for_user_and_session(user_id, session_id)
 
     def get_chat_history_as_dicts(self, user_id: int, session_id: str) -> list[dict[str, any]]:
@@ -105,15 +195,25 @@ class SqliteDbFactory(IDbFactory):
         :return: List of dictionaries, where each dictionary represents a chat message.
                  Keys correspond to column names in the database.
         """
-        with self.get_connection() as conn:
-            chat_dao = SqliteDaoChat(connection=conn, verbose=self.verbose)
-            raw_messages = chat_dao.get_chat_history_for_user_and_session(user_id, session_id)
+        with self._connection(read_only=True) as conn:
+            chat_dao = conn.chat_dao
+            # Rows come back as tuples zipped with the column names, no per-row dict(sqlite3.Row)
+            return chat_dao.get_chat_history_dicts_for_user_and_session(user_id, session_id)
 
-            # Convert sqlite3.Row objects to standard dictionaries
-            chat_messages_dicts = []
-            for row in raw_messages:
-                chat_messages_dicts.append(dict(row)) # sqlite3.Row can be converted to dict
-            return chat_messages_dicts
+    def get_chat_history_columns(self, user_id: int, session_id: str) -> dict[str, list]:
+        """
+        Retrieve chat history for a specific user ID and session ID as parallel columns
+        instead of one object per message, e.g. {"id": [...], "role": [...], "text": [...], ...}.
+        Suited to analytics over many messages: len(), collections.Counter(columns["role"]),
+        "".join(columns["text"]) work on the lists directly.
+
+        :param user_id: ID of the user.
+        :param session_id: ID of the chat session.
+        :return: Dictionary mapping each column name (id, session_id, user_id, role, text)
+                 to the list of its values, in insertion order.
+        """
+        with self._connection(read_only=True) as conn:
+            return conn.chat_dao.get_chat_history_columns_for_user_and_session(user_id, session_id)
 
     def delete_chat_history(self, user_id, session_id):
         """
@@ -122,8 +222,8 @@ class SqliteDbFactory(IDbFactory):
         :param session_id: ID of the chat session.
         :return: True if deletion was successful, False otherwise.
         """
-        with self.get_connection() as conn:
-            chat_dao = SqliteDaoChat(connection=conn,verbose=self.verbose)
+        with self._connection() as conn:
+            chat_dao = conn.chat_dao
             return chat_dao.delete_chat_history(user_id, session_id)
 
     def list_all_chat_history(self, user_id):
@@ -132,45 +232,120 @@ class SqliteDbFactory(IDbFactory):
         :param user_id: ID of the user.
         :return: List of all chat messages for the user.
         """
-        with self.get_connection() as conn:
-            chat_dao = SqliteDaoChat(connection=conn,verbose=self.verbose)
+        with self._connection(read_only=True) as conn:
+            chat_dao = conn.chat_dao
             return chat_dao.get_all_chat_history_by_user(user_id)
             
+    def iter_chat_history(self, user_id, session_id, batch_size=1000):
+        """
+        Stream chat history for a specific user ID and session ID.
+        Rows are fetched from SQLite batch_size at a time and never collected into a list;
+        the pooled connection is held until the iteration ends (or the generator is closed).
+        :param user_id: ID of the user.
+        :param session_id: ID of the chat session.
+        :param batch_size: Number of rows fetched per batch. Default 1000.
+        :return: Generator of (role, text) rows, in insertion order.
+        """
+        with self._connection(read_only=True) as conn:
+            yield from conn.chat_dao.iter_chat_history_for_user_and_session(user_id, session_id, batch_size)
+
+    def iter_all_chat_history(self, user_id, batch_size=1000):
+        """
+        Stream all chat history for a specific user ID (see iter_chat_history()).
+        :param user_id: ID of the user.
+        :param batch_size: Number of rows fetched per batch. Default 1000.
+        :return: Generator of (session_id, role, text) rows, ordered by session then insertion.
+        """
+        with self._connection(read_only=True) as conn:
+            yield from conn.chat_dao.iter_all_chat_history_by_user(user_id, batch_size)
+
+    def get_history_with_session_index(self, user_id):
+        """
+        Retrieve all chat history of a user grouped by session, with one query.
+        Replaces a list_chat_sessions() + list_all_chat_history() pair: the sessions and
+        their messages come from a single statement ordered by session, grouped in one pass.
+        :param user_id: ID of the user.
+        :return: Dictionary {session_id: [(id, role, text), ...]}; keys are the user's sessions
+                 in sorted order (list(result) is the session list), messages in insertion order.
+        """
+        with self._connection(read_only=True) as conn:
+            rows = conn.chat_dao.get_all_chat_history_with_id_by_user(user_id)
+
+        # Rows arrive grouped by session in sorted order, so the dict keys are sorted too
+        history = {}
+        current_session_id, messages = None, None
+        for message_id, session_id, role, text in rows:
+            if messages is None or session_id != current_session_id:
+                current_session_id, messages = session_id, []
+                history[session_id] = messages
+            messages.append((message_id, role, text))
+        return history
+
     def list_chat_sessions(self, user_id):
         """
         Retrieve distinct chat sessions for a specific user ID.
         :param user_id: ID of the user.
         :return: List of distinct session IDs for the user.
         """
-        with self.get_connection() as conn:
-            chat_dao = SqliteDaoChat(connection=conn,verbose=self.verbose)
+        with self._connection(read_only=True) as conn:
+            chat_dao = conn.chat_dao
             # DaoChat.get_distinct_sessions_for_user already returns a list of session IDs
             return chat_dao.get_distinct_sessions_for_user(user_id)
 
+    def delete_session_and_list_remaining(self, user_id, session_id):
+        """
+        Delete a chat session of a user and return the sessions the user has left.
+        The delete and the read share one connection and one transaction (a single commit),
+        and the list reflects the delete.
+        :param user_id: ID of the user.
+        :param session_id: ID of the chat session to delete.
+        :return: List of the remaining distinct session IDs, or None if the deletion failed.
+        """
+        try:
+            with self.transaction() as conn:
+                chat_dao = conn.chat_dao
+                if not chat_dao.delete_chat_history(user_id, session_id):
+                    raise Exception(f"Failed to delete session '{session_id}' of user {user_id}.")
+                return chat_dao.get_distinct_sessions_for_user(user_id)
+        except Exception as e:
+            print(f"Transaction failed for session deletion: {e}")
+            return None
+
+    def add_chat_message_and_count(self, user_id, session_id, role, text):
+        """
+        Add a chat message and return the session's updated message count,
+        both in one transaction (a single commit) on one connection.
+        :return: Tuple (new message ID, number of messages in the session), or None if the insert failed.
+        """
+        try:
+            with self.transaction() as conn:
+                chat_dao = conn.chat_dao
+                message_id = chat_dao.insert_chat_history(user_id, session_id, role, text)
+                if message_id is None:
+                    raise Exception(f"Failed to add chat message for user {user_id}.")
+                return message_id, chat_dao.count_chat_history_for_user_and_session(user_id, session_id)
+        except Exception as e:
+            print(f"Transaction failed for chat message insert: {e}")
+            return None
+
     def register_user_with_initial_message(self, username, password_hash, email, initial_session_id, initial_message_role, initial_message_text):
         """
         Registers a new user and adds an initial chat message in a single transaction.
+        The user's ID comes back from the INSERT itself (RETURNING), so no lookup query is needed.
+        The DAOs cached on the connection join the open transaction, and their statements
+        hit the connection's prepared-statement cache.
         """
-        with self.get_connection() as conn:
-            user_dao = SqliteDaoUser(connection=conn,verbose=self.verbose)
-            chat_dao = SqliteDaoChat(connection=conn,verbose=self.verbose)
-            try:
-                user_inserted = user_dao.insert_user(username, password_hash, email)
-                if not user_inserted:
+        try:
+            # Both inserts run in one BEGIN IMMEDIATE ... COMMIT; any exception rolls both back
+            with self.transaction() as conn:
+                user_id = conn.user_dao.insert_user(username, password_hash, email)
+                if user_id is None:
                     raise Exception(f"Failed to insert user '{username}'.")
 
-                user_id_row = user_dao.get_user_id_by_username(username)
-                if user_id_row is None:
-                    raise Exception(f"Failed to retrieve ID for new user '{username}'.")
-                user_id = user_id_row[user_dao._field_id]
-
-                message_added = chat_dao.insert_chat_history(user_id, initial_session_id, initial_message_role, initial_message_text)
+                message_added = conn.chat_dao.insert_chat_history(user_id, initial_session_id, initial_message_role, initial_message_text)
                 if not message_added:
                     raise Exception(f"Failed to add initial chat message for user '{username}'.")
-                
-                conn.commit() # Explicitly commit the transaction for this multi-DAO operation
-                return True
-            except Exception as e:
-                conn.rollback() # Rollback if any part fails
-                print(f"Transaction failed for user registration and initial message: {e}")
-                return False
\ No newline at end of file
+            return True
+        except Exception as e:
+            print(f"Transaction failed for user registration and initial message: {e}")
+            return False
@@ -34,24 +34,36 @@ from modules.impl.dao.SqliteDaoChat import SqliteDaoChat # Need DaoChat for Chat
 
 from modules.impl.repositories.impl.SqliteUserRepository import UserRepository
 from modules.impl.repositories.impl.SqliteChatRepository import SqliteChatRepository
+from modules.impl.repositories.impl.ShardingChatRepository import ShardingChatRepository
+from modules.impl.repositories.IChatRepository import IChatRepository
 
 from modules.db.connection.IDbConnectionProvider import IDbConnectionProvider
+from modules.db.writer.SqliteWriter import SqliteWriter
+from modules.impl.connection.ShardedSqliteConnectionProvider import ShardedSqliteConnectionProvider
 
 class SqliteRepositoryFactory(IDbFactory):
     _instance = None
     _lock = threading.Lock()
     _db_connection_provider: IDbConnectionProvider = None # Type hint the interface now
+    _chat_shards: ShardedSqliteConnectionProvider = None # Optional: chat history spread over several database files
+    _writers: dict = None # One SqliteWriter per database, keyed by connection provider, see get_writer()
+    _local: threading.local = None # Repositories cached per thread, see get_user_repository()
 
-    def __new__(cls, db_connection_provider: IDbConnectionProvider): # Accept the interface
+    def __new__(cls, db_connection_provider: IDbConnectionProvider, chat_shards: ShardedSqliteConnectionProvider = None): # Accept the interface
         """
         Singleton pattern for RepositoryFactory.
         It takes an instance of IDbConnectionProvider as a dependency.
+        If 'chat_shards' is given, chat messages are stored in its shard databases
+        (shard = user_id % N) instead of the main database, see ShardingChatRepository.
         """
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super(SqliteRepositoryFactory, cls).__new__(cls)
                     cls._instance._db_connection_provider = db_connection_provider
+                    cls._instance._chat_shards = chat_shards
+                    cls._instance._writers = {}
+                    cls._instance._local = threading.local()
         elif cls._instance._db_connection_provider != db_connection_provider:
             print(f"Warning: RepositoryFactory already initialized with a different IDbConnectionProvider instance.")
         return cls._instance
@@ -64,15 +76,101 @@ class SqliteRepositoryFactory(IDbFactory):
         """
         return self._db_connection_provider.get_connection()
     
-    # Example of a method, no changes needed inside
+    def get_writer(self, connection_provider: IDbConnectionProvider = None) -> SqliteWriter:
+        """
+        Returns the SqliteWriter of a database, starting it on first use.
+        The writer thread owns its own write connection; repositories created by this
+        factory queue their writes to it instead of competing for SQLite's write lock.
+            :param connection_provider: Provider of the database to write to. Default: the main database.
+        """
+        provider = connection_provider or self._db_connection_provider
+        writer = self._writers.get(provider)
+        if writer is None:
+            with self._lock:
+                writer = self._writers.get(provider)
+                if writer is None:
+                    writer = SqliteWriter(provider.get_write_connection())
+                    writer.start()
+                    self._writers[provider] = writer
+        return writer
+
+    def stop_writer(self):
+        """Writes everything still queued to the writer threads, then stops them."""
+        with self._lock:
+            writers = list(self._writers.values())
+            self._writers.clear()
+        for writer in writers:
+            writer.stop()
+            writer.conn.close()
+
     def get_user_repository(self) -> UserRepository:
-        connection = self._db_connection_provider.get_connection() 
-        dao_user = SqliteDaoUser(connection=connection) 
-        return UserRepository(dao_user)
-    
-    def get_chat_repository(self) -> SqliteChatRepository:
-        connection = self._db_connection_provider.get_connection()
+        """
+        Returns the calling thread's UserRepository, created on its first call.
+        Each thread gets its own repository and connection (sqlite3 connections must not be
+        used by two threads at once); later calls from the thread reuse them, so the
+        connection setup is paid once and its statement cache stays warm.
+        The connection is borrowed from the provider's pool: a thread that is done with its
+        repositories (e.g., a worker task) must call close_thread_repositories() to hand it back.
+        """
+        repository = getattr(self._local, "user_repository", None)
+        if repository is None:
+            connection = self._thread_connection(self._db_connection_provider)
+            dao_user = SqliteDaoUser(connection=connection)
+            dao_user.writer = self.get_writer()
+            repository = self._local.user_repository = UserRepository(dao_user)
+        return repository
+
+    def get_chat_repository(self) -> IChatRepository:
+        """
+        Returns the calling thread's chat repository, created on its first call
+        (see get_user_repository()).
+        """
+        repository = getattr(self._local, "chat_repository", None)
+        if repository is None:
+            if self._chat_shards is None:
+                repository = self._create_chat_repository(self._db_connection_provider)
+            else:
+                # One repository (connection and writer thread) per shard database
+                shard_repositories = [self._create_chat_repository(shard) for shard in self._chat_shards.shards]
+                cross_shard_dao = None
+                if self._chat_shards.supports_cross_shard_reads():
+                    # Reads spanning every shard use one connection with all shards attached
+                    cross_shard_dao = SqliteDaoChat(connection=self._thread_connection(self._chat_shards))
+                repository = ShardingChatRepository(shard_repositories, cross_shard_dao, self._chat_shards.schemas)
+            self._local.chat_repository = repository
+        return repository
+
+    def close_thread_repositories(self):
+        """
+        Forgets the calling thread's repositories and hands their connections back:
+        to the provider's pool when it has one (acquire/release), closed otherwise.
+        The next get_*_repository() call from the thread creates fresh repositories.
+        """
+        connections = getattr(self._local, "connections", None) or []
+        self._local.connections = []
+        self._local.user_repository = None
+        self._local.chat_repository = None
+        for provider, connection in connections:
+            release = getattr(provider, "release", None)
+            if release is not None:
+                release(connection)
+            else:
+                connection.close()
+
+    def _thread_connection(self, connection_provider: IDbConnectionProvider):
+        """Connection for one of the calling thread's repositories, recorded for close_thread_repositories()."""
+        acquire = getattr(connection_provider, "acquire", None)
+        connection = acquire() if acquire is not None else connection_provider.get_connection()
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = []
+        connections.append((connection_provider, connection))
+        return connection
+
+    def _create_chat_repository(self, connection_provider: IDbConnectionProvider) -> SqliteChatRepository:
+        connection = self._thread_connection(connection_provider)
         dao_chat = SqliteDaoChat(connection=connection)
+        dao_chat.writer = self.get_writer(connection_provider)
         return SqliteChatRepository(dao_chat)
     
     def initialize_database_tables(self):
@@ -82,4 +180,8 @@ class SqliteRepositoryFactory(IDbFactory):
             chat_dao = SqliteDaoChat(connection=conn)
             user_dao.create_table_users()
             chat_dao.create_table_chat_history()
+        if self._chat_shards is not None:
+            for shard in self._chat_shards.shards:
+                with shard.get_connection() as conn:
+                    SqliteDaoChat(connection=conn).create_table_chat_history()
         print("All tables initialized by RepositoryFactory.")
\ No newline at end of file
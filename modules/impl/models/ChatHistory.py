@@ -4,9 +4,29 @@
   This project is licensed under the Educational and Non-Commercial Use License.
   See the LICENSE file for details.
 """
-from typing import List
+from collections.abc import Sequence
+from typing import Iterator, List
 from modules.impl.models.ChatMessage import ChatMessage
 
+class _MessagesView(Sequence):
+    """Read-only view over a list of messages: indexing, len() and iteration without copying it."""
+    __slots__ = ("_messages",)
+
+    def __init__(self, messages: List[ChatMessage]):
+        self._messages = messages
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __repr__(self):
+        return repr(self._messages)
+
 class ChatHistory:
     """
     Represents a chat history for a user in a specific session.
@@ -21,8 +41,19 @@ class ChatHistory:
         self._messages.append(message)
        
 
-    def get_messages(self) -> List[ChatMessage]:
-        return list(self._messages) # Return a copy to prevent external modification
+    def get_messages(self) -> Sequence[ChatMessage]:
+        """
+        Read-only view of the messages (no copy is made, so later additions show up in it).
+        The view is a Sequence, not a list: it supports indexing, slicing, len() and iteration,
+        but has no append()/sort() and compares unequal to a list with the same messages.
+        Use list(history.get_messages()) for an independent, mutable snapshot, and
+        iter_messages() to just loop over the messages.
+        """
+        return _MessagesView(self._messages) # Read-only instead of a copy to prevent external modification
+
+    def iter_messages(self) -> Iterator[ChatMessage]:
+        """Iterate over the messages without allocating a view or a copy."""
+        return iter(self._messages)
 
     def to_list_of_dicts(self) -> List[dict]:
         """Converts chat history to a list of dictionaries, useful for APIs."""
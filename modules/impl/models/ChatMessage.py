@@ -48,6 +48,21 @@ class ChatMessage:
         if self.text is None or not self.text.strip():
             raise ValueError("Chat message cannot be empty.")
 
+    @classmethod
+    def _from_row(cls, id, session_id, user_id, role, text):
+        """
+        Builds a ChatMessage from a database row without running __post_init__.
+        Only for values read back from the database, which were validated when inserted;
+        application code must use the validating constructor.
+        """
+        message = cls.__new__(cls)
+        message.id = id
+        message.session_id = session_id
+        message.user_id = user_id
+        message.role = role
+        message.text = text
+        return message
+
     def to_dict(self):
         """Converts the ChatMessage object to a dictionary."""
         return {
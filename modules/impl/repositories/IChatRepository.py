@@ -5,7 +5,7 @@
   See the LICENSE file for details.
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 # Import your domain model
 from modules.impl.models.ChatMessage import ChatMessage
@@ -17,6 +17,15 @@ class IChatRepository(IRepository[ChatMessage]):
     Defines the contract for interacting with ChatMessage data.
     """
 
+    @abstractmethod
+    def add_many(self, messages: List[ChatMessage]) -> bool:
+        """
+        Adds several chat messages in a single transaction (one commit for the whole list).
+            :param messages: The ChatMessage domain objects to add.
+            :return: True if all messages were added, False otherwise.
+        """
+        pass
+
     @abstractmethod
     def get_messages_by_session_id(self,user_id: int, session_id: str) -> List[ChatMessage]:
         """
@@ -27,10 +36,29 @@ class IChatRepository(IRepository[ChatMessage]):
         pass
 
     @abstractmethod
-    def delete_messages_by_session_id(self, session_id: str) -> bool:
+    def iter_messages_by_user(self, user_id: int) -> Iterator[ChatMessage]:
+        """
+        Streams all chat messages of a user, ordered by session then insertion order.
+        Messages are read from the database in batches, so memory does not grow with the history.
+            :param user_id: The ID of the user.
+            :return: An iterator of ChatMessage domain objects.
+        """
+        pass
+
+    @abstractmethod
+    def iter_all(self) -> Iterator[ChatMessage]:
+        """
+        Streams every chat message in the repository, read from the database in batches.
+            :return: An iterator of ChatMessage domain objects.
+        """
+        pass
+
+    @abstractmethod
+    def delete_messages_by_session_id(self, user_id: int, session_id: str) -> Optional[int]:
         """
-        Deletes all chat messages associated with a specific session ID.
+        Deletes all chat messages of a user's session.
+            :param user_id: The ID of the user owning the session.
             :param session_id: The ID of the chat session.
-            :return: True if messages were deleted, False otherwise.
+            :return: The number of deleted messages (0 if there were none), or None if the deletion failed.
         """
         pass
@@ -28,3 +28,14 @@ class IUserRepository(IRepository[User]):
         """
         pass
 
+    @abstractmethod
+    def add_many(self, users: List[User]) -> List[Optional[int]]:
+        """
+        Adds several users in a single transaction.
+        Each User object that was inserted gets its new ID.
+            :param users: The User domain objects to add.
+            :return: For each user, its new ID, or None if it was not inserted
+                     (e.g., the username or email already exists).
+        """
+        pass
+
@@ -0,0 +1,127 @@
+"""
+  Copyright (c) 2025 Alexandre Kavadias
+
+  This project is licensed under the Educational and Non-Commercial Use License.
+  See the LICENSE file for details.
+"""
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Sequence
+
+from modules.impl.repositories.IChatRepository import IChatRepository
+from modules.impl.dao.SqliteDaoChat import SqliteDaoChat
+from modules.impl.models.ChatMessage import ChatMessage
+
+class ShardingChatRepository(IChatRepository):
+    """
+    IChatRepository spreading chat messages over several shard repositories,
+    typically one SqliteChatRepository per SQLite database file.
+    SQLite allows a single writer per file, so writes routed to different shards
+    proceed in parallel.
+
+    A message lives in shard user_id % N. Message IDs are only unique within a shard,
+    so the IDs exposed by this repository are composite: local_id * N + shard_index.
+    get_by_id(), update() and delete() decode them to find the owning shard.
+    """
+    def __init__(self, shard_repositories: List[IChatRepository], cross_shard_dao: Optional[SqliteDaoChat] = None, shard_schemas: Optional[Sequence[str]] = None):
+        """
+        Initialize the repository.
+            :param shard_repositories: One repository per shard, by shard index.
+            :param cross_shard_dao: Optional DAO on a connection with every shard attached
+                                    (ShardedSqliteConnectionProvider.get_connection()). get_all() and iter_all()
+                                    then read all shards with one UNION ALL query instead of shard by shard.
+            :param shard_schemas: Schema name of each shard on that connection (ShardedSqliteConnectionProvider.schemas).
+        """
+        if not shard_repositories:
+            raise ValueError("ShardingChatRepository requires at least one shard repository.")
+        self._shards = shard_repositories
+        self._cross_shard_dao = cross_shard_dao
+        self._shard_schemas = shard_schemas
+
+    def _shard_index(self, user_id: int) -> int:
+        return user_id % len(self._shards)
+
+    def _to_global_id(self, local_id: int, shard_index: int) -> int:
+        return local_id * len(self._shards) + shard_index
+
+    def _to_global(self, message: Optional[ChatMessage], shard_index: int) -> Optional[ChatMessage]:
+        """Rewrites the ID of a message read from a shard into its composite ID."""
+        if message is not None and message.id is not None:
+            message.id = self._to_global_id(message.id, shard_index)
+        return message
+
+    def add(self, message: ChatMessage) -> Optional[int]:
+        shard_index = self._shard_index(message.user_id)
+        local_id = self._shards[shard_index].add(message)
+        if local_id is None:
+            return None
+        message.id = self._to_global_id(local_id, shard_index)
+        return message.id
+
+    def add_many(self, messages: List[ChatMessage]) -> bool:
+        by_shard = {}
+        for message in messages:
+            by_shard.setdefault(self._shard_index(message.user_id), []).append(message)
+        results = [self._shards[shard_index].add_many(shard_messages) for shard_index, shard_messages in by_shard.items()]
+        return all(results)
+
+    def get_by_id(self, message_id: int) -> Optional[ChatMessage]:
+        shard_index = message_id % len(self._shards)
+        message = self._shards[shard_index].get_by_id(message_id // len(self._shards))
+        return self._to_global(message, shard_index)
+
+    def get_messages_by_session_id(self, user_id: int, session_id: str) -> List[ChatMessage]:
+        shard_index = self._shard_index(user_id)
+        return [self._to_global(message, shard_index)
+                for message in self._shards[shard_index].get_messages_by_session_id(user_id, session_id)]
+
+    def iter_messages_by_user(self, user_id: int) -> Iterator[ChatMessage]:
+        shard_index = self._shard_index(user_id)
+        return (self._to_global(message, shard_index)
+                for message in self._shards[shard_index].iter_messages_by_user(user_id))
+
+    def delete_messages_by_session_id(self, user_id: int, session_id: str) -> Optional[int]:
+        return self._shards[self._shard_index(user_id)].delete_messages_by_session_id(user_id, session_id)
+
+    def delete(self, message_id: int) -> bool:
+        return self._shards[message_id % len(self._shards)].delete(message_id // len(self._shards))
+
+    def update(self, message: ChatMessage) -> bool:
+        if message.id is None:
+            raise ValueError("Chat message ID must be provided for update.")
+        shard_index = message.id % len(self._shards)
+        if shard_index != self._shard_index(message.user_id):
+            raise ValueError("Moving a chat message to another user's shard is not supported.")
+        global_id = message.id
+        message.id = global_id // len(self._shards)
+        try:
+            return self._shards[shard_index].update(message)
+        finally:
+            message.id = global_id
+
+    def get_all(self) -> List[ChatMessage]:
+        """
+        Retrieve all chat messages. With a cross-shard DAO they are read with one query;
+        otherwise the shards are read in parallel and the results merged.
+        :return: A list of all ChatMessage domain objects.
+        """
+        if self._cross_shard_dao is not None:
+            return list(self.iter_all())
+        with ThreadPoolExecutor(max_workers=len(self._shards)) as executor:
+            per_shard = list(executor.map(lambda shard: shard.get_all(), self._shards))
+        return [self._to_global(message, shard_index)
+                for shard_index, messages in enumerate(per_shard)
+                for message in messages]
+
+    def iter_all(self) -> Iterator[ChatMessage]:
+        """
+        Stream all chat messages, one shard after the other
+        (in a single UNION ALL query when a cross-shard DAO is set).
+        :return: An iterator of ChatMessage domain objects.
+        """
+        if self._cross_shard_dao is not None:
+            return (ChatMessage._from_row(*row)
+                    for row in self._cross_shard_dao.iter_all_chat_history_across_shards(self._shard_schemas))
+        return itertools.chain.from_iterable(
+            (self._to_global(message, shard_index) for message in shard.iter_all())
+            for shard_index, shard in enumerate(self._shards))
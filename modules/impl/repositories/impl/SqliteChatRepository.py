@@ -4,7 +4,7 @@
   This project is licensed under the Educational and Non-Commercial Use License.
   See the LICENSE file for details.
 """
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import sqlite3 # Just for type hinting
 
 # Import the interface and the DAO
@@ -17,72 +17,86 @@ class SqliteChatRepository(IChatRepository):
     Concrete implementation of IChatRepository using DaoChat for SQLite persistence.
     Maps database rows to ChatMessage domain models and vice-versa.
     """
+    # SQL is built once at class definition from the DAO's field names, so every call
+    # sends the same string and hits sqlite3's per-connection prepared-statement cache.
+    # Columns are selected in ChatMessage field order, so a row unpacks straight into ChatMessage._from_row(*row).
+    _SQL_SELECT_COLUMNS = f"""SELECT {SqliteDaoChat._field_id}, {SqliteDaoChat._field_session_id},
+                    {SqliteDaoChat._field_user_id}, {SqliteDaoChat._field_role}, {SqliteDaoChat._field_text}
+                    FROM {SqliteDaoChat.tablename}"""
+    _SQL_SELECT_BY_ID = f"""{_SQL_SELECT_COLUMNS}
+                    WHERE {SqliteDaoChat._field_id} = ?"""
+    # Served by idx_chat_user_session (user_id, session_id): the index also holds the rowid (id),
+    # so rows come out in id order without a sort.
+    _SQL_SELECT_BY_SESSION = f"""{_SQL_SELECT_COLUMNS}
+                    WHERE {SqliteDaoChat._field_user_id} = ? AND {SqliteDaoChat._field_session_id} = ?
+                    ORDER BY {SqliteDaoChat._field_id}"""
+    _SQL_SELECT_BY_USER = f"""{_SQL_SELECT_COLUMNS}
+                    WHERE {SqliteDaoChat._field_user_id} = ?
+                    ORDER BY {SqliteDaoChat._field_session_id}, {SqliteDaoChat._field_id}"""
+    _SQL_SELECT_ALL = _SQL_SELECT_COLUMNS
+    _SQL_DELETE = f"DELETE FROM {SqliteDaoChat.tablename} WHERE {SqliteDaoChat._field_id} = ?"
+    _SQL_UPDATE = f"""UPDATE {SqliteDaoChat.tablename}
+                    SET {SqliteDaoChat._field_role} = ?,
+                        {SqliteDaoChat._field_text} = ?,
+                        {SqliteDaoChat._field_session_id} = ?,
+                        {SqliteDaoChat._field_user_id} = ?
+                    WHERE {SqliteDaoChat._field_id} = ?"""
+
     def __init__(self, dao_chat: SqliteDaoChat):
         if not isinstance(dao_chat, SqliteDaoChat):
             raise TypeError("dao_chat must be an instance of DaoChat")
         self._dao_chat = dao_chat
 
-    def _map_row_to_chat_message(self, row: sqlite3.Row) -> Optional[ChatMessage]:
-        """Helper to map a sqlite3.Row object to a ChatMessage domain model."""
+    def _map_row_to_chat_message(self, row: Optional[tuple]) -> Optional[ChatMessage]:
+        """Helper to map a (id, session_id, user_id, role, text) row to a ChatMessage domain model."""
         if row:
-            return ChatMessage(
-                id=row[self._dao_chat._field_id],
-                session_id=row[self._dao_chat._field_session_id],
-                user_id=row[self._dao_chat._field_user_id],
-                role=row[self._dao_chat._field_role],
-                text=row[self._dao_chat._field_text]
-            )
+            return ChatMessage._from_row(*row) # Positional, and no re-validation of stored values
         return None
 
     def add(self, message: ChatMessage) -> Optional[int]:
-        success = self._dao_chat.insert_chat_history(
+        # The ID comes back from the INSERT itself: last_insert_rowid() would be wrong when
+        # the insert ran on another connection (e.g., through a SqliteWriter).
+        message_id = self._dao_chat.insert_chat_history(
              message.user_id,message.session_id, message.role, message.text
         )
-        if success:
-            last_id_row = self._dao_chat.execute_query("SELECT last_insert_rowid()", fetch_one=True)
-            if last_id_row:
-                message.id = last_id_row[0]
-                return message.id
+        if message_id:
+            message.id = message_id
+            return message.id
         return None
 
+    def add_many(self, messages: List[ChatMessage]) -> bool:
+        rows = [(message.user_id, message.session_id, message.role, message.text) for message in messages]
+        # A batch that fits in one statement is sent as a single multi-row INSERT;
+        # larger ones go through executemany(). Either way it is one transaction.
+        if len(rows) <= self._dao_chat.MULTI_INSERT_MAX_ROWS:
+            return self._dao_chat.insert_chat_history_multi(rows)
+        return self._dao_chat.insert_chat_history_many(rows)
+
     def get_by_id(self, message_id: int) -> Optional[ChatMessage]:
-        query = f"""SELECT 
-                    {self._dao_chat._field_id}, {self._dao_chat._field_session_id}, 
-                    {self._dao_chat._field_user_id}, {self._dao_chat._field_role},{self._dao_chat._field_text} 
-                    FROM {self._dao_chat.tablename} 
-                    WHERE {self._dao_chat._field_id} = ?"""
-        row = self._dao_chat.execute_query(query, (message_id,), fetch_one=True)
+        row = self._dao_chat.execute_query(self._SQL_SELECT_BY_ID, (message_id,), fetch_one=True, tuples=True)
         return self._map_row_to_chat_message(row)
 
     def get_messages_by_session_id(self,user_id: int, session_id: str) -> List[ChatMessage]:
-        query = f"""SELECT {self._dao_chat._field_id}, {self._dao_chat._field_session_id}, 
-                    {self._dao_chat._field_user_id}, {self._dao_chat._field_role},{self._dao_chat._field_text} 
-                    FROM {self._dao_chat.tablename} 
-                    WHERE {self._dao_chat._field_session_id} = ? AND {self._dao_chat._field_user_id} = ? """
-        rows = self._dao_chat.execute_query(query, (user_id,session_id,), fetch_all=True)
-        return [self._map_row_to_chat_message(row) for row in rows] if rows else []
+        rows = self._dao_chat.execute_query(self._SQL_SELECT_BY_SESSION, (user_id,session_id,), fetch_all=True, tuples=True)
+        return [ChatMessage._from_row(*row) for row in rows] if rows else []
 
-    def delete_messages_by_session_id(self, session_id: str) -> bool:
-        return self._dao_chat.delete_chat_history_by_session_id(session_id)
+    def iter_messages_by_user(self, user_id: int) -> Iterator[ChatMessage]:
+        return (ChatMessage._from_row(*row) for row in self._dao_chat.iter_query(self._SQL_SELECT_BY_USER, (user_id,), tuples=True))
+
+    def delete_messages_by_session_id(self, user_id: int, session_id: str) -> Optional[int]:
+        return self._dao_chat.delete_chat_history_count(user_id, session_id)
 
     def delete(self, message_id: int) -> bool:
         # Assuming DaoChat has a method to delete by message ID
         # If not, you'd add it to DaoChat first or use a generic delete query via Dao
-        query = f"DELETE FROM {self._dao_chat.tablename} WHERE {self._dao_chat._field_id} = ?"
-        return self._dao_chat._execute_with_retry(query, (message_id,))
+        return self._dao_chat._execute_with_retry(self._SQL_DELETE, (message_id,))
     
     def update(self, message: ChatMessage) -> bool:
-        # Assuming DaoChat has a method to delete by message ID
-        # If not, you'd add it to DaoChat first or use a generic delete query via Dao
-        query = f"""UPDATE {self._dao_chat.tablename} 
-                    SET {self._dao_chat._field_role} = ?, 
-                        {self._dao_chat._field_text} = ?, 
-                        {self._dao_chat._field_session_id} = ?, 
-                        {self._dao_chat._field_user_id} = ? 
-                    WHERE {self._dao_chat._field_id} = ?"""
-        
+        # Without an ID the UPDATE would match no row: fail before sending it to SQLite
+        if message.id is None:
+            raise ValueError("Chat message ID must be provided for update.")
         params = (message.role, message.text, message.session_id,message.user_id,message.id)
-        return self._dao_chat._execute_with_retry(query, params)
+        return self._dao_chat._execute_with_retry(self._SQL_UPDATE, params)
     
    
     
@@ -91,9 +105,12 @@ class SqliteChatRepository(IChatRepository):
         Retrieve all chat messages from the repository.
         :return: A list of all ChatMessage domain objects.
         """
-        query = f"""SELECT 
-                    {self._dao_chat._field_id}, {self._dao_chat._field_session_id},
-                    {self._dao_chat._field_user_id}, {self._dao_chat._field_role}, {self._dao_chat._field_text}
-                    FROM {self._dao_chat.tablename}"""
-        rows = self._dao_chat.execute_query(query, fetch_all=True)
-        return [self._map_row_to_chat_message(row) for row in rows] if rows else []
\ No newline at end of file
+        rows = self._dao_chat.execute_query(self._SQL_SELECT_ALL, fetch_all=True, tuples=True)
+        return [ChatMessage._from_row(*row) for row in rows] if rows else []
+
+    def iter_all(self) -> Iterator[ChatMessage]:
+        """
+        Stream all chat messages from the repository, fetched from SQLite in batches.
+        :return: An iterator of ChatMessage domain objects.
+        """
+        return (ChatMessage._from_row(*row) for row in self._dao_chat.iter_query(self._SQL_SELECT_ALL, tuples=True))
@@ -17,79 +17,73 @@ class UserRepository(IUserRepository):
     Concrete implementation of IUserRepository using DaoUser for SQLite persistence.
     Maps database rows to User domain models and vice-versa.
     """
+    # SQL is built once at class definition from the DAO's field names, so every call
+    # sends the same string and hits sqlite3's per-connection prepared-statement cache.
+    # Columns are selected in User field order, so a row unpacks straight into User(*row).
+    _SQL_SELECT_COLUMNS = f"""SELECT
+                    {SqliteDaoUser._field_id}, {SqliteDaoUser._field_username},
+                    {SqliteDaoUser._field_password_hash}, {SqliteDaoUser._field_email},
+                    {SqliteDaoUser._field_created_at}
+                    FROM {SqliteDaoUser.tablename}"""
+    _SQL_SELECT_BY_ID = f"""{_SQL_SELECT_COLUMNS} WHERE {SqliteDaoUser._field_id} = ?"""
+    _SQL_SELECT_BY_USERNAME = f"""{_SQL_SELECT_COLUMNS}
+                    WHERE {SqliteDaoUser._field_username} = ?"""
+    _SQL_SELECT_ALL = _SQL_SELECT_COLUMNS
+    _SQL_UPDATE = f"""UPDATE {SqliteDaoUser.tablename}
+                    SET {SqliteDaoUser._field_username} = ?,
+                        {SqliteDaoUser._field_password_hash} = ?,
+                        {SqliteDaoUser._field_email} = ?
+                    WHERE {SqliteDaoUser._field_id} = ?"""
+
     def __init__(self, dao_user: SqliteDaoUser):
         if not isinstance(dao_user, SqliteDaoUser):
             raise TypeError("dao_user must be an instance of DaoUser")
         self._dao_user = dao_user
 
-    def _map_row_to_user(self, row: sqlite3.Row) -> Optional[User]:
-        """Helper to map a sqlite3.Row object to a User domain model."""
+    def _map_row_to_user(self, row: Optional[tuple]) -> Optional[User]:
+        """Helper to map an (id, username, password_hash, email, created_at) row to a User domain model."""
         if row:
-            # Note: sqlite3.Row allows dictionary-like access
-            return User(
-                id=row[SqliteDaoUser._field_id],
-                username=row[SqliteDaoUser._field_username],
-                password_hash=row[SqliteDaoUser._field_password_hash],
-                email=row[SqliteDaoUser._field_email],
-                created_at=row[SqliteDaoUser._field_created_at]
-            )
+            return User(*row) # Positional: no per-column lookup by name
         return None
 
     def add(self, user: User) -> Optional[int]:
-        success = self._dao_user.insert_user(user.username, user.password_hash, user.email)
-        if success:
-            # After insertion, we need the last inserted ID.
-            # SQLite's cursor.lastrowid is usually available after an INSERT.
-            # We need to expose this from DaoUser's _execute_with_retry if possible,
-            # or fetch it separately. For now, let's assume we can query it.
-            # A cleaner way would be for DaoUser to return lastrowid.
-            last_id_row = self._dao_user.execute_query("SELECT last_insert_rowid()", fetch_one=True)
-            if last_id_row:
-                user.id = last_id_row[0] # Update the user object with the new ID
-                return user.id
+        # DaoUser.insert_user returns the new ID (INSERT ... RETURNING), which stays correct
+        # when the insert ran on another connection (e.g., through a SqliteWriter).
+        user_id = self._dao_user.insert_user(user.username, user.password_hash, user.email)
+        if user_id:
+            user.id = user_id # Update the user object with the new ID
+            return user.id
         return None
 
+    def add_many(self, users: List[User]) -> List[Optional[int]]:
+        user_ids = self._dao_user.insert_users([(user.username, user.password_hash, user.email) for user in users])
+        if user_ids is None: # Database stayed locked: nothing was inserted
+            return [None] * len(users)
+        for user, user_id in zip(users, user_ids):
+            if user_id:
+                user.id = user_id
+        return user_ids
+
     def get_by_id(self, user_id: int) -> Optional[User]:
-        query = f"""SELECT 
-                    {self._dao_user._field_id}, {self._dao_user._field_username},
-                    {self._dao_user._field_password_hash}, {self._dao_user._field_email}, 
-                    {self._dao_user._field_created_at} 
-                    FROM {self._dao_user.tablename} WHERE {self._dao_user._field_id} = ?"""
-        row = self._dao_user.execute_query(query, (user_id,), fetch_one=True)
+        row = self._dao_user.execute_query(self._SQL_SELECT_BY_ID, (user_id,), fetch_one=True, tuples=True)
         return self._map_row_to_user(row)
 
     def get_by_username(self, username: str) -> Optional[User]:
         # DaoUser.get_user_id_by_username only returns ID, which is not enough for the full User object.
         # We need a new method in DaoUser or a direct query here to get all fields.
-        query = f"""SELECT 
-                    {self._dao_user._field_id}, {self._dao_user._field_username},
-                    {self._dao_user._field_password_hash}, {self._dao_user._field_email},
-                    {self._dao_user._field_created_at} 
-                    FROM {self._dao_user.tablename}
-                    WHERE {self._dao_user._field_username} = ?"""
-        row = self._dao_user.execute_query(query, (username,), fetch_one=True)
+        row = self._dao_user.execute_query(self._SQL_SELECT_BY_USERNAME, (username,), fetch_one=True, tuples=True)
         return self._map_row_to_user(row)
 
     def update(self, user: User) -> bool:
         # Implement update logic using dao_user._execute_with_retry
         if user.id is None:
             raise ValueError("User ID must be provided for update.")
-        query = f"""UPDATE {self._dao_user.tablename} 
-                    SET {self._dao_user._field_username} = ?, 
-                        {self._dao_user._field_password_hash} = ?, 
-                        {self._dao_user._field_email} = ? 
-                    WHERE {self._dao_user._field_id} = ?"""
         params = (user.username, user.password_hash, user.email, user.id)
-        return self._dao_user._execute_with_retry(query, params)
+        return self._dao_user._execute_with_retry(self._SQL_UPDATE, params)
 
     def delete(self, user_id: int) -> bool:
         return self._dao_user.delete_user(user_id)
 
     def get_all(self) -> List[User]:
-        query = f"""SELECT 
-                    {self._dao_user._field_id}, {self._dao_user._field_username}, 
-                    {self._dao_user._field_password_hash}, {self._dao_user._field_email}, 
-                    {self._dao_user._field_created_at} 
-                    FROM {self._dao_user.tablename}"""
-        rows = self._dao_user.execute_query(query, fetch_all=True)
-        return [self._map_row_to_user(row) for row in rows] if rows else []
\ No newline at end of file
+        rows = self._dao_user.execute_query(self._SQL_SELECT_ALL, fetch_all=True, tuples=True)
+        return [User(*row) for row in rows] if rows else []
\ No newline at end of file